@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from db.database import get_connection
+from db.database import connection
 
 st.markdown("""
     <style>
@@ -153,7 +153,6 @@ st.markdown("""
 # ---------------- DATA FETCH ----------------
 
 def fetch_all_bookings():
-    conn = get_connection()
     query = """
     SELECT 
         b.id AS booking_id,
@@ -169,8 +168,8 @@ def fetch_all_bookings():
     JOIN customers c ON b.customer_id = c.customer_id
     ORDER BY b.date, b.time
     """
-    df = pd.read_sql_query(query, conn)
-    conn.close()
+    with connection() as conn:
+        df = pd.read_sql_query(query, conn)
     return df
 
 
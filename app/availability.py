@@ -0,0 +1,298 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date as Date, timedelta
+
+from db.database import connection
+
+
+# Length of one appointment
+SLOT_DURATION_MINUTES = 30
+# Spacing of offered start times
+SLOT_STEP_MINUTES = 30
+MINUTES_PER_DAY = 24 * 60
+
+# Hours searched when looking for the earliest free slot
+CLINIC_OPEN_MINUTE = 9 * 60
+CLINIC_CLOSE_MINUTE = 17 * 60
+
+# Days kept in memory per process
+MAX_CACHED_DAYS = 1024
+# Upper bound on staleness from bookings made by other processes,
+# which cannot invalidate this process's cache
+CACHE_TTL_SECONDS = 60
+
+
+class DayAvailability:
+    """
+    Occupancy of one specialty's day as a per-minute bitmap, with
+    prefix sums so any slot is checked in O(1).
+    """
+
+    def __init__(self, busy_intervals, slot_minutes: int = SLOT_DURATION_MINUTES):
+        self.slot_minutes = slot_minutes
+
+        busy = bytearray(MINUTES_PER_DAY)
+        for start, end in busy_intervals:
+            start = max(start, 0)
+            end = min(end, MINUTES_PER_DAY)
+            if start < end:
+                busy[start:end] = b"\x01" * (end - start)
+
+        # busy_before[m] = busy minutes in [0, m)
+        self._busy_before = [0] * (MINUTES_PER_DAY + 1)
+        for minute, flag in enumerate(busy):
+            self._busy_before[minute + 1] = self._busy_before[minute] + flag
+
+    def is_free(self, start: int) -> bool:
+        end = start + self.slot_minutes
+        if start < 0 or end > MINUTES_PER_DAY:
+            return False
+        return self._busy_before[end] == self._busy_before[start]
+
+    def free_slots(self, step: int = SLOT_STEP_MINUTES, offset: int = 0) -> list[int]:
+        """
+        Free start minutes on the grid offset + k * step.
+        """
+        first = offset % step
+        return [
+            start for start in range(first, MINUTES_PER_DAY - self.slot_minutes + 1, step)
+            if self.is_free(start)
+        ]
+
+    def nearest_free(
+        self,
+        minute: int,
+        count: int,
+        step: int = SLOT_STEP_MINUTES,
+        open_minute: int = CLINIC_OPEN_MINUTE,
+        close_minute: int = CLINIC_CLOSE_MINUTE,
+    ) -> list[int]:
+        """
+        Up to count free starts closest to minute within clinic hours,
+        on a grid through minute itself, nearest first (earlier first
+        on ties).
+        """
+        found = []
+        last_start = close_minute - self.slot_minutes
+        max_distance = max(abs(minute - open_minute), abs(last_start - minute))
+        for distance in range(step, max_distance + 1, step):
+            for start in (minute - distance, minute + distance):
+                if open_minute <= start <= last_start and self.is_free(start):
+                    found.append(start)
+                    if len(found) == count:
+                        return found
+        return found
+
+    def first_free(self, window_start: int, window_end: int, step: int = SLOT_STEP_MINUTES):
+        """
+        Earliest free start in [window_start, window_end) on the
+        grid through window_start, or None.
+        """
+        for start in range(max(window_start, 0), window_end, step):
+            if self.is_free(start):
+                return start
+        return None
+
+
+_cache = OrderedDict()  # (date, specialty) -> (loaded_at, DayAvailability)
+# (date, specialty) -> generation of its last invalidation, bounded
+# like _cache; generations come from one counter and never repeat
+_generations = OrderedDict()
+_generation_counter = itertools.count(1)
+# Reported for days without an entry: at least every evicted
+# generation, so a load that started before an evicted
+# invalidation still sees a change
+_generation_floor = 0
+_cache_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _load_busy_intervals(date: str, doctor_or_specialty: str) -> list[tuple[int, int]]:
+    with connection() as conn:
+        return conn.execute("""
+            SELECT start_minute, end_minute
+            FROM bookings
+            WHERE booking_type = ?
+            AND date = ?
+            AND start_minute IS NOT NULL
+        """, (doctor_or_specialty, date)).fetchall()
+
+
+def _generation(key) -> int:
+    return _generations.get(key, _generation_floor)
+
+
+def get_day_availability(date: str, doctor_or_specialty: str) -> DayAvailability:
+    """
+    Availability of one specialty's day, loaded with a single
+    indexed query and cached until a booking for that day is
+    inserted (or CACHE_TTL_SECONDS pass).
+    """
+    key = (date, doctor_or_specialty)
+    now = time.monotonic()
+
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and now - entry[0] < CACHE_TTL_SECONDS:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return entry[1]
+        _stats["misses"] += 1
+        generation = _generation(key)
+
+    day = DayAvailability(_load_busy_intervals(date, doctor_or_specialty))
+
+    with _cache_lock:
+        # Skip caching if a booking landed while we were loading
+        if _generation(key) == generation:
+            _cache[key] = (now, day)
+            _cache.move_to_end(key)
+            while len(_cache) > MAX_CACHED_DAYS:
+                _cache.popitem(last=False)
+    return day
+
+
+def invalidate_day(date: str, doctor_or_specialty: str):
+    """
+    Drops the cached day; call after committing a booking for it.
+    """
+    global _generation_floor
+    key = (date, doctor_or_specialty)
+    with _cache_lock:
+        _cache.pop(key, None)
+        _generations[key] = next(_generation_counter)
+        _generations.move_to_end(key)
+        while len(_generations) > MAX_CACHED_DAYS:
+            _, evicted = _generations.popitem(last=False)
+            _generation_floor = max(_generation_floor, evicted)
+        _stats["invalidations"] += 1
+
+
+def get_availability_stats() -> dict:
+    with _cache_lock:
+        stats = dict(_stats)
+        stats["cached_days"] = len(_cache)
+        stats["tracked_generations"] = len(_generations)
+    return stats
+
+
+@dataclass(frozen=True, order=True)
+class FreeSlot:
+    date: str
+    start_minute: int
+    doctor_or_specialty: str
+
+
+def _merge_busy(intervals) -> list[tuple[int, int]]:
+    """
+    Sorted, disjoint busy intervals from intervals sorted by start.
+    """
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _free_starts(busy, first: int, close: int, slot: int, step: int):
+    """
+    Free grid starts in [first, close - slot] given merged busy
+    intervals; one forward pass over both.
+    """
+    i = 0
+    for start in range(first, close - slot + 1, step):
+        while i < len(busy) and busy[i][1] <= start:
+            i += 1
+        if i == len(busy) or busy[i][0] >= start + slot:
+            yield start
+
+
+def _iter_specialty_slots(cursor, doctor_or_specialty, days, not_before, open_minute,
+                          close_minute, slot, step):
+    """
+    Free slots of one specialty in (date, minute) order, from its
+    bookings streamed in index order.
+    """
+    rows = iter(cursor)
+    pending = next(rows, None)
+
+    for day in days:
+        intervals = []
+        # <= also skips rows whose date text is not in days
+        while pending is not None and pending[0] <= day:
+            if pending[0] == day:
+                intervals.append((pending[1], pending[2]))
+            pending = next(rows, None)
+
+        first = open_minute
+        if not_before is not None:
+            if day < not_before[0]:
+                continue
+            if day == not_before[0] and not_before[1] > first:
+                # Stay on the opening-time grid
+                first += -(-(not_before[1] - first) // step) * step
+
+        for start in _free_starts(_merge_busy(intervals), first, close_minute, slot, step):
+            yield FreeSlot(day, start, doctor_or_specialty)
+
+
+def find_earliest_slots(
+    specialties,
+    start_date: str,
+    end_date: str,
+    count: int = 3,
+    not_before: tuple[str, int] = None,
+    open_minute: int = CLINIC_OPEN_MINUTE,
+    close_minute: int = CLINIC_CLOSE_MINUTE,
+) -> list[FreeSlot]:
+    """
+    The earliest count free slots across specialties between
+    start_date and end_date (inclusive, YYYY-MM-DD) within clinic
+    hours, skipping anything before not_before = (date, minute).
+
+    Each specialty's bookings are read once, already sorted by the
+    (booking_type, date, start_minute) index; the per-specialty free
+    slot streams are merged lazily, so reading stops as soon as
+    count slots are found.
+    """
+    if isinstance(specialties, str):
+        specialties = [specialties]
+
+    first_day = Date.fromisoformat(start_date)
+    last_day = Date.fromisoformat(end_date)
+    days = [
+        (first_day + timedelta(days=n)).isoformat()
+        for n in range((last_day - first_day).days + 1)
+    ]
+    if not days or count <= 0:
+        return []
+
+    with connection() as conn:
+        streams = []
+        for doctor_or_specialty in specialties:
+            cursor = conn.execute("""
+                SELECT date, start_minute, end_minute
+                FROM bookings
+                WHERE booking_type = ?
+                AND date BETWEEN ? AND ?
+                AND start_minute IS NOT NULL
+                ORDER BY date, start_minute
+            """, (doctor_or_specialty, start_date, end_date))
+            streams.append(_iter_specialty_slots(
+                cursor, doctor_or_specialty, days, not_before,
+                open_minute, close_minute, SLOT_DURATION_MINUTES, SLOT_STEP_MINUTES,
+            ))
+
+        found = []
+        for slot in heapq.merge(*streams):
+            found.append(slot)
+            if len(found) == count:
+                break
+        return found
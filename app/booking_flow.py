@@ -1,9 +1,10 @@
 import streamlit as st
 import re
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from tools import save_booking, send_confirmation_email
-from tools import is_slot_available, suggest_nearby_slots
+from availability import find_earliest_slots
+from tools import reserve_slot, ReservationStatus, send_confirmation_email
+from tools import is_slot_available, suggest_nearby_slots, minutes_to_time_str
 
 
 REQUIRED_FIELDS = [
@@ -24,6 +25,10 @@ FIELD_QUESTIONS = {
     "time": "What time would you prefer? (e.g., 10:30 AM)",
 }
 
+# On a conflict, offer the earliest openings within this many days
+EARLIEST_SEARCH_DAYS = 7
+EARLIEST_OFFERS = 3
+
 
 # ---------------- VALIDATION HELPERS ----------------
 
@@ -62,8 +67,8 @@ def initialize_booking_state():
             "confirmed": False,
 
             # slot validation
-            "slot_conflict": False,
             "suggested_slots": [],
+            "offered_slots": [],
             "current_field": None,
         }
 
@@ -86,6 +91,12 @@ def update_booking_state(user_message: str):
 
     value = user_message.strip()
 
+    # Picking one of the earliest openings by number
+    offers = state.get("offered_slots") or []
+    if field == "time" and value.isdigit() and 1 <= int(value) <= len(offers):
+        state["date"], value = offers[int(value) - 1]
+        state["offered_slots"] = []
+
     if field == "email" and not is_valid_email(value):
         return "Please enter a valid email address."
 
@@ -104,23 +115,9 @@ def update_booking_state(user_message: str):
 
         # -------- SLOT CHECK --------
         if not is_slot_available(date, value, specialty):
-            state["slot_conflict"] = True
-            state["suggested_slots"] = suggest_nearby_slots(
-                date, value, specialty
-            )
-
-            suggestion_text = ""
-            if state["suggested_slots"]:
-                suggestion_text = (
-                    "\n\n**Available nearby slots:** "
-                    + ", ".join(state["suggested_slots"])
-                )
-
-            return (
-                "The selected time slot is already booked for this specialty.\n\n"
-                "Would you like to continue anyway?\n\n"
-                "Reply **Yes** to continue or **No** to choose another time."
-                + suggestion_text
+            return slot_taken_message(
+                "The selected time slot is already booked for this specialty.",
+                value,
             )
 
     # ---------- SAVE FIELD ----------
@@ -129,6 +126,68 @@ def update_booking_state(user_message: str):
     return None
 
 
+def slot_taken_message(reason: str, time_str: str) -> str:
+    """
+    Asks for a different time, offering nearby free slots
+    and the earliest openings in the coming days.
+    """
+    state = st.session_state.booking_state
+    state["time"] = None
+    state["current_field"] = "time"
+    state["suggested_slots"] = suggest_nearby_slots(
+        state["date"], time_str, state["doctor_or_specialty"]
+    )
+    state["offered_slots"] = earliest_openings(
+        state["date"], state["doctor_or_specialty"], state["suggested_slots"]
+    )
+
+    suggestion_text = ""
+    if state["suggested_slots"]:
+        suggestion_text = (
+            "\n\n**Available nearby slots:** "
+            + ", ".join(state["suggested_slots"])
+        )
+
+    if state["offered_slots"]:
+        suggestion_text += (
+            "\n\n**Earliest openings:**\n\n"
+            + "\n".join(
+                f"{n}. {date} at {slot_time}"
+                for n, (date, slot_time) in enumerate(state["offered_slots"], start=1)
+            )
+            + "\n\nReply with a number to take one of these, or enter another time."
+        )
+
+    return reason + "\n\n" + FIELD_QUESTIONS["time"] + suggestion_text
+
+
+def earliest_openings(date: str, specialty: str, exclude_times: list[str]) -> list[tuple[str, str]]:
+    """
+    Earliest free (date, time) pairs for the specialty from the
+    requested date (or today, if later), skipping times already
+    suggested for the requested date.
+    """
+    now = datetime.now()
+    start_day = max(datetime.strptime(date, "%Y-%m-%d").date(), now.date())
+    end_day = start_day + timedelta(days=EARLIEST_SEARCH_DAYS - 1)
+
+    slots = find_earliest_slots(
+        specialty,
+        start_day.isoformat(),
+        end_day.isoformat(),
+        count=EARLIEST_OFFERS + len(exclude_times),
+        not_before=(now.date().isoformat(), now.hour * 60 + now.minute),
+    )
+
+    offers = []
+    for slot in slots:
+        slot_time = minutes_to_time_str(slot.start_minute)
+        if slot.date == date and slot_time in exclude_times:
+            continue
+        offers.append((slot.date, slot_time))
+    return offers[:EARLIEST_OFFERS]
+
+
 def summarize_booking():
     b = st.session_state.booking_state
     return (
@@ -149,33 +208,27 @@ def handle_booking_intent(user_message: str) -> str:
     initialize_booking_state()
     state = st.session_state.booking_state
 
-    # ---------- SLOT CONFLICT DECISION ----------
-    if state.get("slot_conflict"):
-        if user_message.lower() in ["yes", "y"]:
-            state["slot_conflict"] = False
-            state["suggested_slots"] = []
-            return summarize_booking()
-
-        elif user_message.lower() in ["no", "n"]:
-            state["slot_conflict"] = False
-            state["time"] = None
-            state["current_field"] = "time"
-            return FIELD_QUESTIONS["time"]
-
-        else:
-            return (
-                "Please reply **Yes** to continue with the same time "
-                "or **No** to choose a different slot."
-            )
-
     # ---------- CONFIRMATION ----------
     if all(state.get(f) for f in REQUIRED_FIELDS):
         if not state["confirmed"]:
             if user_message.lower() in ["yes", "y", "confirm"]:
-                state["confirmed"] = True
-
                 booking_data = state.copy()
-                booking_id = save_booking(booking_data)
+                result = reserve_slot(booking_data)
+
+                if result.status is ReservationStatus.SLOT_TAKEN:
+                    # Someone else confirmed an overlapping slot meanwhile
+                    return slot_taken_message(
+                        "Sorry, this time slot was just booked by someone else.",
+                        booking_data["time"],
+                    )
+
+                if result.status is ReservationStatus.INVALID_TIME:
+                    state["time"] = None
+                    state["current_field"] = "time"
+                    return "Please enter a valid time (e.g., 10:30 AM)."
+
+                state["confirmed"] = True
+                booking_id = result.booking_id
 
                 email_body = (
                     f"Hello {booking_data['name']},\n\n"
@@ -0,0 +1,393 @@
+"""
+Bulk booking import and export.
+
+    python app/bulk_io.py import appointments.csv
+    python app/bulk_io.py import appointments.jsonl --dry-run
+    python app/bulk_io.py export bookings.csv
+    python app/bulk_io.py export - --format jsonl | gzip > bookings.jsonl.gz
+"""
+import argparse
+import csv
+import json
+import sys
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass, field
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from availability import SLOT_DURATION_MINUTES, invalidate_day
+from booking_flow import REQUIRED_FIELDS, is_valid_date, is_valid_email, is_valid_phone, is_valid_time
+from db.database import connection, transaction
+from tools import minutes_to_time_str, normalize_email, normalize_time_to_minutes
+
+
+# Rows written per transaction
+IMPORT_CHUNK_ROWS = 5000
+# Rows fetched per round trip when exporting
+EXPORT_FETCH_ROWS = 1000
+# Rejected rows kept in the report; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+EXPORT_COLUMNS = [
+    "booking_id",
+    "name",
+    "email",
+    "phone",
+    "doctor_or_specialty",
+    "date",
+    "time",
+    "status",
+    "created_at",
+]
+
+
+@dataclass
+class ImportReport:
+    rows_read: int = 0
+    imported: int = 0
+    rejected: int = 0
+    errors: list = field(default_factory=list)  # (line, reason)
+
+    def reject(self, line: int, reason: str):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, reason))
+
+
+def _detect_format(path: str, fmt: str | None) -> str:
+    if fmt:
+        return fmt
+    return "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def read_rows(path: str, fmt: str = None):
+    """
+    Yields (line_number, row dict) from a CSV file with a header
+    row or a JSONL file, one row at a time.
+    """
+    fmt = _detect_format(path, fmt)
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+            return
+
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, {"_error": f"invalid JSON: {e.msg}"}
+                continue
+            yield line_number, row if isinstance(row, dict) else {"_error": "not a JSON object"}
+
+
+def validate_row(row: dict):
+    """
+    Cleans a row with the booking flow's validation rules; returns
+    (booking_data, start_minute) or raises ValueError.
+    """
+    if "_error" in row:
+        raise ValueError(row["_error"])
+
+    booking_data = {}
+    for name in REQUIRED_FIELDS:
+        value = row.get(name)
+        value = "" if value is None else str(value).strip()
+        if not value:
+            raise ValueError(f"missing {name}")
+        booking_data[name] = value
+
+    if not is_valid_email(booking_data["email"]):
+        raise ValueError(f"invalid email {booking_data['email']!r}")
+    if not is_valid_phone(booking_data["phone"]):
+        raise ValueError(f"invalid phone {booking_data['phone']!r}")
+    if not is_valid_date(booking_data["date"]):
+        raise ValueError(f"invalid date {booking_data['date']!r}")
+
+    start_minute = None
+    if is_valid_time(booking_data["time"]):
+        start_minute = normalize_time_to_minutes(booking_data["time"])
+    if start_minute is None:
+        raise ValueError(f"invalid time {booking_data['time']!r}")
+
+    booking_data["email"] = normalize_email(booking_data["email"])
+    return booking_data, start_minute
+
+
+class SlotBook:
+    """
+    Taken start minutes per (specialty, date): existing bookings,
+    loaded once per day from the database, plus rows accepted so
+    far. Conflicts are found by bisecting, with no query per row.
+    """
+
+    def __init__(self, slot_minutes: int = SLOT_DURATION_MINUTES):
+        self.slot_minutes = slot_minutes
+        self._starts = {}  # (specialty, date) -> sorted start minutes
+        self._lines = {}  # (specialty, date, start) -> import line
+
+    def _day(self, key):
+        starts = self._starts.get(key)
+        if starts is None:
+            with connection() as conn:
+                starts = sorted(
+                    row[0] for row in conn.execute("""
+                        SELECT start_minute
+                        FROM bookings
+                        WHERE booking_type = ?
+                        AND date = ?
+                        AND start_minute IS NOT NULL
+                    """, key)
+                )
+            self._starts[key] = starts
+        return starts
+
+    def conflict(self, specialty: str, date: str, start: int):
+        """
+        None if [start, start + slot) is free, else a description
+        of the booking it overlaps.
+        """
+        key = (specialty, date)
+        starts = self._day(key)
+        i = bisect_right(starts, start - self.slot_minutes)
+        if i == len(starts) or starts[i] >= start + self.slot_minutes:
+            return None
+
+        line = self._lines.get((specialty, date, starts[i]))
+        if line is None:
+            return f"slot taken by an existing booking at {minutes_to_time_str(starts[i])}"
+        return f"overlaps line {line}"
+
+    def take(self, specialty: str, date: str, start: int, line: int):
+        insort(self._day((specialty, date)), start)
+        self._lines[(specialty, date, start)] = line
+
+
+def _booked_conflicts(conn, chunk) -> list[tuple[int, str]]:
+    """
+    (line, reason) for chunk rows overlapping a booking now in the
+    database, with one query per (specialty, date) in the chunk.
+    Catches bookings made in the app since SlotBook read the day.
+    """
+    days = {}
+    for line, booking_data, start_minute in chunk:
+        key = (booking_data["doctor_or_specialty"], booking_data["date"])
+        days.setdefault(key, []).append((line, start_minute))
+
+    conflicts = []
+    for key, rows in days.items():
+        booked = conn.execute("""
+            SELECT start_minute, end_minute
+            FROM bookings
+            WHERE booking_type = ?
+            AND date = ?
+            AND start_minute IS NOT NULL
+            ORDER BY start_minute
+        """, key).fetchall()
+        starts = [start for start, _ in booked]
+
+        # Same overlap test as tools._conflicting_times
+        for line, start_minute in rows:
+            low = bisect_right(starts, start_minute - SLOT_DURATION_MINUTES)
+            high = bisect_left(starts, start_minute + SLOT_DURATION_MINUTES)
+            for start, end in booked[low:high]:
+                if end > start_minute:
+                    conflicts.append((
+                        line, f"slot taken by an existing booking at {minutes_to_time_str(start)}"
+                    ))
+                    break
+    return conflicts
+
+
+def _write_chunk(chunk) -> list[tuple[int, str]]:
+    """
+    Upserts the chunk's customers and inserts its bookings in one
+    transaction, two executemany calls in all. Rows that overlap a
+    booking committed since the import read their day are skipped;
+    returns them as (line, reason).
+    """
+    with transaction(immediate=True) as conn:
+        conflicts = _booked_conflicts(conn, chunk)
+        if conflicts:
+            taken = {line for line, _ in conflicts}
+            chunk = [row for row in chunk if row[0] not in taken]
+
+        # Later rows win, as with one upsert per booking
+        conn.executemany("""
+            INSERT INTO customers (name, email, phone)
+            VALUES (?, ?, ?)
+            ON CONFLICT (email) DO UPDATE SET
+                name = excluded.name,
+                phone = excluded.phone
+        """, [
+            (booking_data["name"], booking_data["email"], booking_data["phone"])
+            for _, booking_data, _ in chunk
+        ])
+        conn.executemany("""
+            INSERT INTO bookings (
+                customer_id, booking_type, date, time, status,
+                start_minute, end_minute
+            )
+            VALUES (
+                (SELECT customer_id FROM customers WHERE email = ?),
+                ?, ?, ?, 'CONFIRMED', ?, ?
+            )
+        """, [
+            (
+                booking_data["email"],
+                booking_data["doctor_or_specialty"],
+                booking_data["date"],
+                booking_data["time"],
+                start_minute,
+                start_minute + SLOT_DURATION_MINUTES,
+            )
+            for _, booking_data, start_minute in chunk
+        ])
+
+    for day in {(b["date"], b["doctor_or_specialty"]) for _, b, _ in chunk}:
+        invalidate_day(*day)
+    return conflicts
+
+
+def _import_chunk(chunk, report: ImportReport, dry_run: bool):
+    conflicts = [] if dry_run else _write_chunk(chunk)
+    for line, reason in conflicts:
+        report.reject(line, reason)
+    report.imported += len(chunk) - len(conflicts)
+
+
+def import_bookings(path: str, fmt: str = None, chunk_rows: int = IMPORT_CHUNK_ROWS,
+                    dry_run: bool = False) -> ImportReport:
+    """
+    Imports bookings from a CSV or JSONL file, streaming it.
+
+    Invalid rows and rows overlapping an existing or earlier
+    imported booking are rejected and reported; the rest are
+    written in transactions of chunk_rows.
+    """
+    report = ImportReport()
+    slots = SlotBook()
+    chunk = []
+
+    for line, row in read_rows(path, fmt):
+        report.rows_read += 1
+        try:
+            booking_data, start_minute = validate_row(row)
+        except ValueError as e:
+            report.reject(line, str(e))
+            continue
+
+        specialty = booking_data["doctor_or_specialty"]
+        conflict = slots.conflict(specialty, booking_data["date"], start_minute)
+        if conflict:
+            report.reject(line, conflict)
+            continue
+        slots.take(specialty, booking_data["date"], start_minute, line)
+
+        chunk.append((line, booking_data, start_minute))
+        if len(chunk) == chunk_rows:
+            _import_chunk(chunk, report, dry_run)
+            chunk = []
+
+    if chunk:
+        _import_chunk(chunk, report, dry_run)
+
+    return report
+
+
+def iter_bookings(fetch_rows: int = EXPORT_FETCH_ROWS):
+    """
+    Yields every booking as a tuple in EXPORT_COLUMNS order, in id
+    order so SQLite streams them without sorting. One read
+    transaction: the export is a consistent snapshot.
+    """
+    with connection() as conn:
+        cursor = conn.execute("""
+            SELECT
+                b.id,
+                c.name,
+                c.email,
+                c.phone,
+                b.booking_type,
+                b.date,
+                b.time,
+                b.status,
+                b.created_at
+            FROM bookings b
+            LEFT JOIN customers c ON b.customer_id = c.customer_id
+            ORDER BY b.id
+        """)
+        while True:
+            rows = cursor.fetchmany(fetch_rows)
+            if not rows:
+                break
+            yield from rows
+
+
+def export_bookings(out, fmt: str = "csv") -> int:
+    """
+    Writes all bookings to the text stream out as CSV (with a
+    header) or JSONL; returns the number written.
+    """
+    written = 0
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(EXPORT_COLUMNS)
+        for row in iter_bookings():
+            writer.writerow(row)
+            written += 1
+    else:
+        for row in iter_bookings():
+            out.write(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n")
+            written += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk booking import and export")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="import bookings from CSV or JSONL")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=["csv", "jsonl"])
+    import_parser.add_argument("--chunk-rows", type=int, default=IMPORT_CHUNK_ROWS)
+    import_parser.add_argument("--dry-run", action="store_true", help="validate without writing")
+
+    export_parser = commands.add_parser("export", help="export all bookings")
+    export_parser.add_argument("path", help="output file, or - for stdout")
+    export_parser.add_argument("--format", choices=["csv", "jsonl"])
+
+    args = parser.parse_args()
+
+    from db.models import create_tables
+    create_tables()
+
+    if args.command == "import":
+        report = import_bookings(args.path, args.format, args.chunk_rows, args.dry_run)
+        for line, reason in report.errors:
+            print(f"line {line}: {reason}", file=sys.stderr)
+        if report.rejected > len(report.errors):
+            print(f"... and {report.rejected - len(report.errors)} more", file=sys.stderr)
+        print(
+            f"{'Validated' if args.dry_run else 'Imported'} {report.imported} of "
+            f"{report.rows_read} rows, rejected {report.rejected}",
+            file=sys.stderr,
+        )
+        return
+
+    fmt = args.format or ("csv" if args.path == "-" else _detect_format(args.path, None))
+    if args.path == "-":
+        written = export_bookings(sys.stdout, fmt)
+    else:
+        with open(args.path, "w", newline="", encoding="utf-8") as out:
+            written = export_bookings(out, fmt)
+    print(f"Exported {written} bookings", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
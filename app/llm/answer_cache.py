@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+ANSWER_CACHE_MAX_ENTRIES = 1000
+ANSWER_CACHE_TTL_SECONDS = 60 * 60
+# Cosine similarity above which two questions share an answer
+ANSWER_CACHE_SIMILARITY = 0.95
+
+
+class SemanticAnswerCache:
+    """
+    Caches LLM answers per corpus version, matching new questions
+    to cached ones by embedding similarity instead of exact text.
+    Query vectors must be L2-normalized so the dot product is the
+    cosine similarity.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+        threshold: float = ANSWER_CACHE_SIMILARITY,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        # entry_id -> (version, vector, answer, created_at), in LRU order
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _purge_expired(self, now: float):
+        expired = [
+            entry_id for entry_id, entry in self._entries.items()
+            if now - entry[3] > self.ttl_seconds
+        ]
+        for entry_id in expired:
+            del self._entries[entry_id]
+        self.evictions += len(expired)
+
+    def get(self, version: str, query_vector: np.ndarray):
+        """
+        Returns the cached answer for the most similar question over
+        the same corpus version, or None below the threshold.
+        """
+        with self._lock:
+            self._purge_expired(time.time())
+
+            candidates = [
+                (entry_id, entry[1]) for entry_id, entry in self._entries.items()
+                if entry[0] == version
+            ]
+            if candidates:
+                ids, vectors = zip(*candidates)
+                scores = np.stack(vectors) @ query_vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self._entries.move_to_end(ids[best])
+                    self.hits += 1
+                    return self._entries[ids[best]][2]
+
+            self.misses += 1
+            return None
+
+    def put(self, version: str, query_vector: np.ndarray, answer: str):
+        with self._lock:
+            self._entries[self._next_id] = (
+                version,
+                np.asarray(query_vector, dtype=np.float32),
+                answer,
+                time.time(),
+            )
+            self._next_id += 1
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Shared by every session in the process: identical document sets
+# uploaded in different sessions have the same corpus version.
+answer_cache = SemanticAnswerCache()
@@ -1,11 +1,30 @@
+import hashlib
+import json
+import threading
+import time
+
 import streamlit as st
-import requests
+
+from llm.gateway import get_gateway
+from llm.http_client import get_http_client
 
 
 GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_MODEL = "llama-3.1-8b-instant"
 
+_metrics_lock = threading.Lock()
+_metrics = {
+    "requests": 0,
+    "failures": 0,
+    "last_ttft_seconds": None,
+    "last_total_seconds": None,
+}
 
-def generate_llm_response(query: str, context: str) -> str:
+
+def _build_request(query: str, context: str, stream: bool = False):
+    """
+    Returns (headers, payload), or None when no API key is configured.
+    """
     if "GROQ_API_KEY" not in st.secrets:
         return None
 
@@ -17,7 +36,7 @@ def generate_llm_response(query: str, context: str) -> str:
     }
 
     payload = {
-        "model": "llama-3.1-8b-instant",
+        "model": GROQ_MODEL,
         "temperature": 0.2,
         "messages": [
             {
@@ -35,21 +54,177 @@ def generate_llm_response(query: str, context: str) -> str:
             },
         ],
     }
+    if stream:
+        payload["stream"] = True
+
+    return headers, payload
+
+
+def _record_metrics(ttft: float | None, total: float, failed: bool):
+    with _metrics_lock:
+        _metrics["requests"] += 1
+        if failed:
+            _metrics["failures"] += 1
+        _metrics["last_ttft_seconds"] = ttft
+        _metrics["last_total_seconds"] = total
+
+
+def get_llm_metrics() -> dict:
+    """
+    Returns request counters and the time to first token / total
+    latency of the most recent call (ttft equals total when not streaming).
+    """
+    with _metrics_lock:
+        return dict(_metrics)
+
+
+def _post_completion(headers: dict, payload: dict) -> str | None:
+    """
+    One non-streaming upstream call; returns the answer or None.
+    """
+    started = time.perf_counter()
 
     try:
-        response = requests.post(
+        response = get_http_client().post(
             GROQ_API_URL,
             headers=headers,
             json=payload,
-            timeout=30,
         )
 
         if response.status_code != 200:
+            _record_metrics(None, time.perf_counter() - started, failed=True)
             return None
 
         data = response.json()
-        return data["choices"][0]["message"]["content"]
+        answer = data["choices"][0]["message"]["content"]
+        elapsed = time.perf_counter() - started
+        _record_metrics(elapsed, elapsed, failed=False)
+        return answer
 
     except Exception:
+        _record_metrics(None, time.perf_counter() - started, failed=True)
         return None
-    
\ No newline at end of file
+
+
+def iter_sse_tokens(lines):
+    """
+    Parses an OpenAI-compatible server-sent event stream,
+    yielding the content delta of each chunk as it arrives.
+    Returns True if the stream signalled completion ([DONE] or a
+    finish_reason), False if the lines ran out first.
+    """
+    finished = False
+    for line in lines:
+        if not line or not line.startswith("data:"):
+            continue
+
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return True
+
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            continue
+
+        for choice in chunk.get("choices", []):
+            token = (choice.get("delta") or {}).get("content")
+            if token:
+                yield token
+            if choice.get("finish_reason"):
+                finished = True
+
+    return finished
+
+
+def _post_completion_stream(headers: dict, payload: dict):
+    """
+    One streaming upstream call; yields tokens as they arrive.
+    Raises RuntimeError if the request fails or the stream ends
+    before the completion does, after any tokens already yielded.
+    """
+    started = time.perf_counter()
+    ttft = None
+    failed = True
+
+    try:
+        with get_http_client().post(
+            GROQ_API_URL,
+            headers=headers,
+            json=payload,
+            stream=True,
+        ) as response:
+            if response.status_code != 200:
+                raise RuntimeError(f"LLM request failed with status {response.status_code}")
+
+            # SSE is UTF-8; requests would guess ISO-8859-1 without a charset
+            lines = (line.decode("utf-8") for line in response.iter_lines(chunk_size=None))
+            parser = iter_sse_tokens(lines)
+            while True:
+                try:
+                    token = next(parser)
+                except StopIteration as stop:
+                    finished = stop.value
+                    break
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                yield token
+
+            if not finished:
+                raise RuntimeError("LLM stream ended before completion")
+            failed = False
+
+    finally:
+        _record_metrics(ttft, time.perf_counter() - started, failed=failed)
+
+
+def _coalesce_key(payload: dict) -> str:
+    """
+    Identifies a (model, prompt) pair; concurrent identical
+    requests share one upstream call through the gateway.
+    """
+    prompt = json.dumps(
+        [payload["model"], payload["temperature"], payload["messages"]],
+        sort_keys=True,
+    )
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def _session_id() -> str:
+    return st.session_state.get("session_id", "anonymous")
+
+
+def generate_llm_response(query: str, context: str) -> str:
+    request = _build_request(query, context)
+    if request is None:
+        return None
+
+    headers, payload = request
+
+    def fetch(emit):
+        answer = _post_completion(headers, payload)
+        if not answer:
+            raise RuntimeError("LLM request failed")
+        emit(answer)
+
+    return get_gateway().complete(_session_id(), _coalesce_key(payload), fetch)
+
+
+def stream_llm_response(query: str, context: str):
+    """
+    Streaming variant of generate_llm_response: yields answer
+    tokens as the completion is generated. Raises LLMRequestError
+    if the request fails or the stream is cut off; tokens yielded
+    before that are a partial answer.
+    """
+    request = _build_request(query, context, stream=True)
+    if request is None:
+        return
+
+    headers, payload = request
+
+    def fetch(emit):
+        for token in _post_completion_stream(headers, payload):
+            emit(token)
+
+    yield from get_gateway().stream(_session_id(), _coalesce_key(payload), fetch)
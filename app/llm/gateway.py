@@ -0,0 +1,207 @@
+import asyncio
+import queue
+import threading
+from collections import deque
+
+
+# Upstream LLM calls in flight at once across every session
+MAX_CONCURRENT_REQUESTS = 8
+# How long a caller waits for the next token before giving up
+WAIT_TIMEOUT_SECONDS = 180
+
+_END = object()
+_FAILED = object()
+
+
+class LLMRequestError(RuntimeError):
+    """
+    The upstream call failed or its stream ended before the
+    completion did; tokens yielded before it are partial.
+    """
+
+
+class _Job:
+    """
+    One upstream call and everyone waiting on its output.
+    Only touched from the gateway's event loop thread.
+    """
+
+    def __init__(self, key: str, fetch):
+        self.key = key
+        self.fetch = fetch
+        self.tokens = []
+        self.subscribers = []
+        self.done = False
+        self.failed = False
+
+    def subscribe(self, subscriber: queue.Queue):
+        # Late joiners replay what has been produced so far
+        for token in self.tokens:
+            subscriber.put(token)
+        if self.done:
+            subscriber.put(_FAILED if self.failed else _END)
+        else:
+            self.subscribers.append(subscriber)
+
+    def publish(self, token: str):
+        self.tokens.append(token)
+        for subscriber in self.subscribers:
+            subscriber.put(token)
+
+    def finish(self, failed: bool = False):
+        self.done = True
+        self.failed = failed
+        for subscriber in self.subscribers:
+            subscriber.put(_FAILED if failed else _END)
+        self.subscribers.clear()
+
+
+class LLMGateway:
+    """
+    asyncio-based front door for upstream LLM calls.
+
+    - At most max_concurrent calls run at once; waiting calls are
+      dispatched round-robin across sessions so one busy session
+      cannot starve the others.
+    - Calls with the same key (model + prompt) that overlap in time
+      share one upstream call; every caller receives the same tokens.
+
+    The event loop runs in a daemon thread and owns all scheduling
+    state; blocking upstream I/O runs in the loop's executor.
+    Callers use the synchronous stream() / complete() API.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_REQUESTS):
+        self.max_concurrent = max_concurrent
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever,
+            name="llm-gateway",
+            daemon=True,
+        )
+        self._thread.start()
+
+        self._queues = {}  # session_id -> deque of jobs waiting to run
+        self._turns = deque()  # sessions with waiting jobs, in round-robin order
+        self._jobs = {}  # key -> job queued or in flight
+        self._in_flight = 0
+        self._stats = {
+            "submitted": 0,
+            "coalesced": 0,
+            "completed": 0,
+            "failed": 0,
+            "max_in_flight": 0,
+        }
+
+    # ---------- event loop side ----------
+
+    def _submit(self, session_id: str, key: str, fetch, subscriber: queue.Queue):
+        self._stats["submitted"] += 1
+
+        job = self._jobs.get(key)
+        if job is not None:
+            self._stats["coalesced"] += 1
+            job.subscribe(subscriber)
+            return
+
+        job = _Job(key, fetch)
+        job.subscribe(subscriber)
+        self._jobs[key] = job
+
+        if session_id not in self._queues:
+            self._queues[session_id] = deque()
+            self._turns.append(session_id)
+        self._queues[session_id].append(job)
+        self._dispatch()
+
+    def _dispatch(self):
+        while self._in_flight < self.max_concurrent and self._turns:
+            session_id = self._turns.popleft()
+            pending = self._queues[session_id]
+            job = pending.popleft()
+            if pending:
+                self._turns.append(session_id)
+            else:
+                del self._queues[session_id]
+
+            self._in_flight += 1
+            self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._in_flight)
+            self._loop.create_task(self._run(job))
+
+    async def _run(self, job: _Job):
+        def emit(token: str):
+            self._loop.call_soon_threadsafe(job.publish, token)
+
+        failed = False
+        try:
+            await self._loop.run_in_executor(None, job.fetch, emit)
+            self._stats["completed"] += 1
+        except Exception as e:
+            print("LLM gateway error:", e)
+            self._stats["failed"] += 1
+            failed = True
+        finally:
+            # Runs after every emit callback queued before it
+            self._loop.call_soon(self._finish, job, failed)
+
+    def _finish(self, job: _Job, failed: bool):
+        self._jobs.pop(job.key, None)
+        job.finish(failed)
+        self._in_flight -= 1
+        self._dispatch()
+
+    # ---------- caller side ----------
+
+    def stream(self, session_id: str, key: str, fetch):
+        """
+        Yields the tokens of the call identified by key, running
+        fetch(emit) upstream unless an identical call is in flight.
+        fetch runs in a worker thread and calls emit(token) per token.
+        Raises LLMRequestError after the last token if fetch raised
+        or no token arrived within WAIT_TIMEOUT_SECONDS.
+        """
+        subscriber = queue.Queue()
+        self._loop.call_soon_threadsafe(self._submit, session_id, key, fetch, subscriber)
+
+        while True:
+            try:
+                token = subscriber.get(timeout=WAIT_TIMEOUT_SECONDS)
+            except queue.Empty:
+                raise LLMRequestError("LLM request timed out")
+            if token is _END:
+                return
+            if token is _FAILED:
+                raise LLMRequestError("LLM request failed")
+            yield token
+
+    def complete(self, session_id: str, key: str, fetch) -> str | None:
+        """
+        Blocking variant of stream(): returns the joined text,
+        or None if the call failed or produced nothing.
+        """
+        try:
+            answer = "".join(self.stream(session_id, key, fetch))
+        except LLMRequestError:
+            return None
+        return answer or None
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["in_flight"] = self._in_flight
+        stats["queued"] = sum(len(pending) for pending in self._queues.values())
+        return stats
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    """
+    Returns the process-wide LLM gateway.
+    """
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway()
+        return _gateway
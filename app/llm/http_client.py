@@ -0,0 +1,176 @@
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Keep-alive connections kept per host; one is used per in-flight call
+POOL_SIZE = 10
+REQUEST_TIMEOUT_SECONDS = 30
+MAX_RETRIES = 3
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8.0
+# Upper bound on a server-requested Retry-After wait
+RETRY_AFTER_MAX_SECONDS = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Attempts kept for latency percentiles
+METRICS_WINDOW = 500
+
+
+def parse_retry_after(value) -> float | None:
+    """
+    Parses a Retry-After header given either as seconds
+    or as an HTTP date. Returns None if absent or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(retry_at.timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMHttpClient:
+    """
+    Long-lived pooled HTTP client for LLM calls.
+
+    Connections are reused across calls (and Streamlit sessions), so
+    only the first request to a host pays the TCP/TLS handshake.
+    429 and 5xx responses and connection errors are retried with
+    full-jitter exponential backoff, honouring Retry-After.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = POOL_SIZE,
+        max_retries: int = MAX_RETRIES,
+        backoff_base: float = BACKOFF_BASE_SECONDS,
+        backoff_max: float = BACKOFF_MAX_SECONDS,
+        timeout: float = REQUEST_TIMEOUT_SECONDS,
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=pool_size,
+            max_retries=0,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._attempts = deque(maxlen=METRICS_WINDOW)
+        self._counters = {
+            "requests": 0,
+            "attempts": 0,
+            "retries": 0,
+            "errors": 0,
+        }
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _record_attempt(self, attempt: int, status, seconds: float):
+        with self._lock:
+            self._counters["attempts"] += 1
+            if attempt > 0:
+                self._counters["retries"] += 1
+            if status is None:
+                self._counters["errors"] += 1
+            self._attempts.append({
+                "attempt": attempt,
+                "status": status,
+                "seconds": seconds,
+                "at": time.time(),
+            })
+
+    def post(self, url: str, headers: dict, json: dict, stream: bool = False):
+        """
+        POSTs with retries. Returns the final response (which may
+        still be an error status once retries are exhausted) and
+        raises the last connection error if no response was received.
+        """
+        with self._lock:
+            self._counters["requests"] += 1
+
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                response = self.session.post(
+                    url,
+                    headers=headers,
+                    json=json,
+                    timeout=self.timeout,
+                    stream=stream,
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                self._record_attempt(attempt, None, time.perf_counter() - started)
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+
+            self._record_attempt(attempt, response.status_code, time.perf_counter() - started)
+
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+
+            delay = parse_retry_after(response.headers.get("Retry-After"))
+            if delay is None:
+                delay = self._backoff(attempt)
+            response.close()
+            time.sleep(min(delay, RETRY_AFTER_MAX_SECONDS))
+
+    def metrics(self) -> dict:
+        """
+        Returns counters, the most recent attempts and latency
+        percentiles over the last METRICS_WINDOW attempts.
+        """
+        with self._lock:
+            attempts = list(self._attempts)
+            metrics = dict(self._counters)
+
+        latencies = sorted(a["seconds"] for a in attempts)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+
+        metrics.update({
+            "p50_seconds": percentile(50),
+            "p95_seconds": percentile(95),
+            "recent_attempts": attempts[-20:],
+        })
+        return metrics
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> LLMHttpClient:
+    """
+    Returns the process-wide LLM HTTP client.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMHttpClient()
+        return _client
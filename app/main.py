@@ -8,7 +8,6 @@ sys.path.append(str(ROOT_DIR))
 import streamlit as st
 from datetime import datetime, date
 import calendar
-import pandas as pd
 
 from chat_logic import (
     initialize_chat_state,
@@ -18,10 +17,12 @@ from chat_logic import (
 )
 
 from booking_flow import handle_booking_intent
-from rag_pipeline import ingest_pdfs, rag_query
+from rag_pipeline import ingest_pdfs, rag_query, EMBEDDING_MODEL_NAME
+from utils.embedding_registry import warm_start
+from utils.index_janitor import start_index_janitor
 from admin_dashboard import render_admin_dashboard
 from db.models import create_tables
-from db.database import get_connection
+from db.database import connection
 
 st.set_page_config(
     page_title="AI Doctor Booking Assistant",
@@ -260,22 +261,24 @@ if "session_id" not in st.session_state:
 # Initialize DB tables
 create_tables()
 
+# Load the embedding model in the background (once per process)
+warm_start(EMBEDDING_MODEL_NAME)
+
+# Evict abandoned session indexes from disk (once per process)
+start_index_janitor()
+
 def get_booking_stats():
     try:
-        conn = get_connection()
+        # Counted in SQL so the date index is used instead of loading every row
         query = """
         SELECT 
-            b.date
+            COUNT(*)
         FROM bookings b
+        WHERE b.date = ?
         """
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        
-        if df.empty:
-            return {"today_bookings": 0}
-        
         today = datetime.today().strftime("%Y-%m-%d")
-        today_bookings = len(df[df["date"] == today])
+        with connection() as conn:
+            (today_bookings,) = conn.execute(query, (today,)).fetchone()
         
         return {"today_bookings": today_bookings}
     except:
@@ -382,6 +385,9 @@ if uploaded_pdfs:
             st.success("Documents processed successfully!")
         else:
             st.error("Could not extract text from the uploaded PDFs.")
+elif st.session_state.get("ingested_files"):
+    # All files were removed from the uploader: drop their vectors
+    ingest_pdfs([])
 
 
 initialize_chat_state()
@@ -421,9 +427,13 @@ if user_input:
         if intent == "booking":
             assistant_reply = handle_booking_intent(user_input)
         else:
-            assistant_reply = rag_query(user_input)
+            assistant_reply = None
 
     # Show assistant response
-    add_message("assistant", assistant_reply)
     with st.chat_message("assistant"):
-        st.markdown(assistant_reply)
+        if assistant_reply is None:
+            # RAG answers are streamed token by token
+            assistant_reply = st.write_stream(rag_query(user_input, stream=True))
+        else:
+            st.markdown(assistant_reply)
+    add_message("assistant", assistant_reply)
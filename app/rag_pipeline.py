@@ -1,66 +1,368 @@
+import hashlib
+from bisect import bisect_right
+from itertools import islice
+
 import streamlit as st
 from pypdf import PdfReader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import HuggingFaceEmbeddings
 
+from llm.answer_cache import answer_cache
+from utils.context_builder import build_context, make_token_counter
+from utils.embedder import embed_query, embed_texts
+from utils.embedding_cache import get_embedding_cache
+from utils.embedding_registry import get_embeddings, get_encode_pool
+from utils.index_factory import (
+    build_index,
+    choose_index_kind,
+    index_kind,
+    needs_rebuild,
+    read_vectors,
+    stores_exact_vectors,
+)
 from utils.faiss_store import (
     save_faiss_index,
     load_faiss_index,
+    delete_faiss_index,
+    get_index_version,
+    load_manifest,
+    save_manifest,
 )
 
 
 EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 100
+# Text held before splitting; bounds memory per document being ingested
+SPLIT_WINDOW_CHARS = CHUNK_SIZE * 8
+# Chunks embedded and added to the index at a time
+INGEST_BATCH_SIZE = 512
+# Encode processes for ingestion; 0 or 1 encodes in-process
+EMBED_WORKERS = 0
+# "auto" picks flat / hnsw / ivf from the corpus size
+INDEX_KIND = "auto"
+# Vector encoding on disk: "float32", "float16" or "pq"
+INDEX_STORAGE = "float32"
+# Chunks retrieved per query, then merged and packed into the prompt
+RETRIEVAL_K = 4
+# Upper bound on context tokens sent to the LLM
+CONTEXT_TOKEN_BUDGET = 1000
+
+
+def iter_pdf_pages(pdf):
+    """
+    Yields (page_number, text) for every page of a PDF
+    that has extractable text. Page numbers start at 1.
+    """
+    reader = PdfReader(pdf)
+    for page_number, page in enumerate(reader.pages, start=1):
+        page_text = page.extract_text()
+        if page_text:
+            yield page_number, page_text + "\n"
 
 
 def extract_text_from_pdfs(pdf_files):
-    text = ""
-    for pdf in pdf_files:
-        reader = PdfReader(pdf)
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-    return text
+    return "".join(
+        page_text
+        for pdf in pdf_files
+        for _, page_text in iter_pdf_pages(pdf)
+    )
 
 
-def ingest_pdfs(pdf_files):
+def iter_document_chunks(pdf, splitter, document_key: str = None):
     """
-    Process PDFs once, create FAISS, save to disk.
+    Streams one PDF as (chunk_text, metadata) pairs.
+
+    Pages are appended to a bounded window that is split as soon as
+    it grows past SPLIT_WINDOW_CHARS; every chunk except the last is
+    emitted and the last one is carried into the next window, so
+    chunks still span page breaks but never another document.
+    Metadata holds the source file, the document's ingestion key
+    (filenames need not be unique), the page the chunk starts on and
+    character offsets into the document text.
     """
-    text = extract_text_from_pdfs(pdf_files)
-    if not text.strip():
-        return False
+    source = getattr(pdf, "name", "document.pdf")
 
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500,
-        chunk_overlap=100,
-    )
+    window = ""
+    window_start = 0  # document offset of window[0]
+    page_offsets = []  # document offset where each page starts
+    page_numbers = []
+    document_length = 0
 
-    chunks = splitter.split_text(text)
+    def split_window():
+        """
+        Returns (chunks, start of each chunk within the window).
+        """
+        chunks = []
+        starts = []
+        search_from = 0
+        for piece in splitter.split_text(window):
+            start = window.find(piece, search_from)
+            search_from = start + 1
+            doc_start = window_start + start
+            page_index = bisect_right(page_offsets, doc_start) - 1
+            chunks.append((
+                piece,
+                {
+                    "source": source,
+                    "document": document_key,
+                    "page": page_numbers[page_index],
+                    "start_index": doc_start,
+                    "end_index": doc_start + len(piece),
+                },
+            ))
+            starts.append(start)
+        return chunks, starts
 
-    embeddings = HuggingFaceEmbeddings(
-        model_name=EMBEDDING_MODEL_NAME
-    )
+    for page_number, page_text in iter_pdf_pages(pdf):
+        page_offsets.append(document_length)
+        page_numbers.append(page_number)
+        document_length += len(page_text)
+        window += page_text
 
-    from langchain_community.vectorstores import FAISS
+        if len(window) < SPLIT_WINDOW_CHARS:
+            continue
 
-    vector_store = FAISS.from_texts(chunks, embeddings)
+        chunks, starts = split_window()
+        if len(chunks) < 2:
+            continue
 
-    save_faiss_index(
-        vector_store,
-        st.session_state.session_id,
+        # The last chunk may be cut short by the window end:
+        # re-split it together with the following pages.
+        yield from chunks[:-1]
+        carry_start = starts[-1]
+
+        window = window[carry_start:]
+        window_start += carry_start
+
+        # Forget pages that ended before the new window
+        first_page = bisect_right(page_offsets, window_start) - 1
+        del page_offsets[:first_page]
+        del page_numbers[:first_page]
+
+    if window.strip():
+        yield from split_window()[0]
+
+
+def iter_batches(items, batch_size: int):
+    """
+    Groups an iterable into lists of at most batch_size items.
+    """
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def get_ingestion_key(pdf) -> str:
+    """
+    Content hash of an uploaded file plus the settings that
+    shape its chunks and vectors. Changing either re-ingests.
+    """
+    digest = hashlib.sha256()
+    digest.update(
+        f"{EMBEDDING_MODEL_NAME}|{CHUNK_SIZE}|{CHUNK_OVERLAP}|".encode()
     )
+    digest.update(pdf.getvalue())
+    return digest.hexdigest()
+
+
+def get_corpus_version(keys) -> str:
+    """
+    Identifies a set of ingested documents independent of upload
+    order and session, so equal corpora share cached answers.
+    """
+    digest = hashlib.sha256()
+    for key in sorted(set(keys)):
+        digest.update(key.encode())
+    return digest.hexdigest()
+
+
+def _rebuild_vectors(vector_store, embeddings, pool, cache):
+    """
+    Original float32 vectors of every indexed chunk, in id order.
+    Read straight from the index when it stores them exactly;
+    float16 / PQ codes are never re-encoded, the chunks are looked
+    up in the embedding cache (or embedded again) instead.
+    """
+    index = vector_store.index
+    if stores_exact_vectors(index):
+        return read_vectors(index)
+
+    texts = [
+        vector_store.docstore.search(vector_store.index_to_docstore_id[row]).page_content
+        for row in range(index.ntotal)
+    ]
+    return embed_texts(embeddings, texts, pool=pool, cache=cache)
+
+
+def ingest_pdfs(pdf_files):
+    """
+    Incrementally sync the session FAISS index with the uploaded PDFs.
+    New files (by content hash) are chunked, embedded and appended;
+    files the user dropped have their vectors removed. A manifest
+    beside the index records which vectors belong to which file.
+    """
+    session_id = st.session_state.session_id
+    keys = [get_ingestion_key(pdf) for pdf in pdf_files]
+
+    # Fast path: same files as the last run and the index has not been
+    # changed or evicted since, so no disk access at all.
+    # Maps key -> True if the file produced text.
+    ingested = st.session_state.get("ingested_files")
+    if (
+        ingested is not None
+        and set(ingested) == set(keys)
+        and st.session_state.get("index_version") == get_index_version(session_id)
+    ):
+        return any(ingested.values())
 
-    return True
+    manifest = load_manifest(session_id)
+    documents = manifest["documents"]
 
+    # Identical uploads under different names are ingested once
+    uploads = {}
+    for key, pdf in zip(keys, pdf_files):
+        uploads.setdefault(key, pdf)
 
-def rag_query(query: str):
+    removed_keys = [key for key in documents if key not in uploads]
+    new_files = {key: pdf for key, pdf in uploads.items() if key not in documents}
+
+    if removed_keys or new_files:
+        manifest["version"] = get_corpus_version(keys)
+        embeddings = get_embeddings(EMBEDDING_MODEL_NAME)
+        pool = get_encode_pool(EMBEDDING_MODEL_NAME, EMBED_WORKERS)
+        cache = get_embedding_cache(EMBEDDING_MODEL_NAME, embeddings)
+
+        vector_store = None
+        if any(doc["ids"] for doc in documents.values()):
+            vector_store = load_faiss_index(session_id, embeddings, writable=True)
+
+        removed_ids = []
+        for key in removed_keys:
+            removed_ids.extend(documents.pop(key)["ids"])
+
+        if vector_store is None:
+            # Index missing or unreadable: the kept documents' vectors
+            # went with it, so ingest them again from the uploads
+            for key in documents:
+                new_files.setdefault(key, uploads[key])
+            documents.clear()
+
+        index_params = manifest.get("index", {})
+
+        if vector_store is not None and removed_ids:
+            if index_kind(vector_store.index) != "flat":
+                # IVF / HNSW keep their ids on removal, while the
+                # docstore mapping assumes compaction: delete from flat.
+                vector_store.index, index_params = build_index(
+                    _rebuild_vectors(vector_store, embeddings, pool, cache), "flat"
+                )
+            vector_store.delete(removed_ids)
+
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
+        )
+
+        for key, pdf in new_files.items():
+            ids = []
+            chunks = iter_document_chunks(pdf, splitter, key)
+
+            for batch in iter_batches(chunks, INGEST_BATCH_SIZE):
+                texts = [text for text, _ in batch]
+                metadatas = [metadata for _, metadata in batch]
+                batch_ids = [f"{key}:{len(ids) + i}" for i in range(len(batch))]
+                vectors = embed_texts(embeddings, texts, pool=pool, cache=cache)
+
+                if vector_store is None:
+                    from langchain_community.vectorstores import FAISS
+
+                    vector_store = FAISS.from_embeddings(
+                        zip(texts, vectors),
+                        embeddings,
+                        metadatas=metadatas,
+                        ids=batch_ids,
+                    )
+                else:
+                    vector_store.add_embeddings(
+                        zip(texts, vectors),
+                        metadatas=metadatas,
+                        ids=batch_ids,
+                    )
+
+                ids.extend(batch_ids)
+
+            documents[key] = {"name": pdf.name, "ids": ids}
+
+        if vector_store is not None and vector_store.index.ntotal > 0:
+            kind = INDEX_KIND
+            if kind == "auto":
+                kind = choose_index_kind(vector_store.index.ntotal)
+
+            if needs_rebuild(vector_store.index, index_params, kind, INDEX_STORAGE):
+                vector_store.index, index_params = build_index(
+                    _rebuild_vectors(vector_store, embeddings, pool, cache), kind, INDEX_STORAGE
+                )
+
+            manifest["index"] = index_params or {"kind": "flat", "storage": "float32"}
+            save_faiss_index(vector_store, session_id, manifest)
+        else:
+            delete_faiss_index(session_id)
+            save_manifest(session_id, manifest)
+
+    st.session_state.ingested_files = {
+        key: bool(doc["ids"]) for key, doc in documents.items()
+    }
+    st.session_state.corpus_version = manifest.get("version")
+    st.session_state.index_version = get_index_version(session_id)
+    return any(st.session_state.ingested_files.values())
+
+
+NO_ANSWER_MESSAGE = "I could not generate an answer at the moment. Please try again."
+INTERRUPTED_ANSWER_NOTE = "\n\n_The answer was interrupted. Please ask again for the full answer._"
+
+
+def _reply(text: str, stream: bool):
+    return iter([text]) if stream else text
+
+
+def _stream_answer(query: str, context: str, corpus_version, query_vector):
+    """
+    Yields answer tokens from the LLM as they arrive and caches
+    the full answer once the stream completes. A stream that fails
+    part way is shown as interrupted and never cached.
+    """
+    from llm.chatgroq_llm import stream_llm_response
+    from llm.gateway import LLMRequestError
+
+    pieces = []
+    try:
+        for token in stream_llm_response(query, context):
+            pieces.append(token)
+            yield token
+    except LLMRequestError as e:
+        print("LLM stream error:", e)
+        yield INTERRUPTED_ANSWER_NOTE if pieces else NO_ANSWER_MESSAGE
+        return
+
+    answer = "".join(pieces)
+    if not answer:
+        yield NO_ANSWER_MESSAGE
+        return
+
+    if corpus_version is not None:
+        answer_cache.put(corpus_version, query_vector, answer)
+
+
+def rag_query(query: str, stream: bool = False):
     """
     Load FAISS from disk and perform retrieval.
+    With stream=True, returns an iterator of answer text pieces
+    suitable for st.write_stream instead of a string.
     """
-    embeddings = HuggingFaceEmbeddings(
-        model_name=EMBEDDING_MODEL_NAME
-    )
+    embeddings = get_embeddings(EMBEDDING_MODEL_NAME)
 
     vector_store = load_faiss_index(
         st.session_state.session_id,
@@ -68,20 +370,45 @@ def rag_query(query: str):
     )
 
     if vector_store is None:
-        return "No documents uploaded yet. Please upload PDFs first."
+        return _reply("No documents uploaded yet. Please upload PDFs first.", stream)
+
+    query_vector = embed_query(embeddings, query)
+
+    corpus_version = st.session_state.get("corpus_version")
+    if corpus_version is None:
+        corpus_version = load_manifest(st.session_state.session_id).get("version")
 
-    docs = vector_store.similarity_search(query, k=4)
+    if corpus_version is not None:
+        cached_answer = answer_cache.get(corpus_version, query_vector)
+        if cached_answer is not None:
+            return _reply(cached_answer, stream)
+
+    docs = vector_store.similarity_search_by_vector(query_vector, k=RETRIEVAL_K)
 
     if not docs:
-        return "I could not find relevant information in the uploaded documents."
+        return _reply(
+            "I could not find relevant information in the uploaded documents.",
+            stream,
+        )
+
+    context, context_stats = build_context(
+        docs,
+        CONTEXT_TOKEN_BUDGET,
+        make_token_counter(embeddings),
+    )
+    st.session_state.last_context_stats = context_stats
 
-    context = "\n\n".join(doc.page_content for doc in docs)
+    if stream:
+        return _stream_answer(query, context, corpus_version, query_vector)
 
     from llm.chatgroq_llm import generate_llm_response
 
     answer = generate_llm_response(query, context)
 
     if not answer:
-        return "I could not generate an answer at the moment. Please try again."
+        return NO_ANSWER_MESSAGE
+
+    if corpus_version is not None:
+        answer_cache.put(corpus_version, query_vector, answer)
 
     return answer
@@ -1,7 +1,10 @@
-from db.database import get_connection
+from db.database import connection, transaction
+from availability import SLOT_DURATION_MINUTES, get_day_availability, invalidate_day
 import smtplib
 import streamlit as st
+from dataclasses import dataclass
 from email.message import EmailMessage
+from enum import Enum
 from datetime import datetime, timedelta
 import re
 
@@ -9,101 +12,131 @@ import re
 # -----------------------------
 # DATABASE: Save Booking
 # -----------------------------
-def save_booking(booking_data: dict):
-    conn = get_connection()
-    cursor = conn.cursor()
+def normalize_email(email: str) -> str:
+    """
+    Key customers are deduplicated on.
+    """
+    return email.strip().lower()
 
-    # Insert customer
+
+def _upsert_customer(cursor, booking_data: dict) -> int:
+    """
+    Returns the customer id for the booking's email, creating the
+    customer or refreshing their name and phone.
+    """
     cursor.execute("""
         INSERT INTO customers (name, email, phone)
         VALUES (?, ?, ?)
+        ON CONFLICT (email) DO UPDATE SET
+            name = excluded.name,
+            phone = excluded.phone
+        RETURNING customer_id
     """, (
         booking_data["name"],
-        booking_data["email"],
+        normalize_email(booking_data["email"]),
         booking_data["phone"],
     ))
+    return cursor.fetchone()[0]
+
 
-    customer_id = cursor.lastrowid
+def _insert_booking(cursor, booking_data: dict, start_minute: int | None) -> int:
+    """
+    Upserts the customer and inserts the booking row; returns the
+    booking id.
+    """
+    customer_id = _upsert_customer(cursor, booking_data)
 
     # Insert booking
     cursor.execute("""
-        INSERT INTO bookings (customer_id, booking_type, date, time, status)
-        VALUES (?, ?, ?, ?, ?)
+        INSERT INTO bookings (
+            customer_id, booking_type, date, time, status,
+            start_minute, end_minute
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?)
     """, (
         customer_id,
         booking_data["doctor_or_specialty"],
         booking_data["date"],
         booking_data["time"],
         "CONFIRMED",
+        start_minute,
+        None if start_minute is None else start_minute + SLOT_DURATION_MINUTES,
     ))
 
-    booking_id = cursor.lastrowid
+    return cursor.lastrowid
 
-    conn.commit()
-    conn.close()
 
+def save_booking(booking_data: dict):
+    with transaction() as conn:
+        booking_id = _insert_booking(
+            conn.cursor(),
+            booking_data,
+            normalize_time_to_minutes(booking_data["time"]),
+        )
+
+    invalidate_day(booking_data["date"], booking_data["doctor_or_specialty"])
     return booking_id
 
 
-def safe_save_booking(booking_data: dict):
-    """
-    Final safety check before saving booking.
-    Prevents double-booking for the same
-    date, time, and specialty.
-    """
+class ReservationStatus(str, Enum):
+    RESERVED = "reserved"
+    SLOT_TAKEN = "slot_taken"
+    INVALID_TIME = "invalid_time"
 
-    conn = get_connection()
-    cursor = conn.cursor()
 
-    # Re-check slot availability at DB level
-    cursor.execute("""
-        SELECT COUNT(*)
-        FROM bookings
-        WHERE date = ?
-        AND time = ?
-        AND booking_type = ?
-    """, (
-        booking_data["date"],
-        booking_data["time"],
-        booking_data["doctor_or_specialty"],
-    ))
+@dataclass(frozen=True)
+class ReservationResult:
+    """
+    Outcome of reserve_slot. On SLOT_TAKEN, conflicting_times
+    lists the existing bookings that overlap the requested slot.
+    """
+    status: ReservationStatus
+    booking_id: int | None = None
+    conflicting_times: tuple = ()
 
-    conflict_count = cursor.fetchone()[0]
+    @property
+    def reserved(self) -> bool:
+        return self.status is ReservationStatus.RESERVED
 
-    if conflict_count > 0:
-        conn.close()
-        return None  # Slot already taken
 
-    # Insert customer
-    cursor.execute("""
-        INSERT INTO customers (name, email, phone)
-        VALUES (?, ?, ?)
-    """, (
-        booking_data["name"],
-        booking_data["email"],
-        booking_data["phone"],
-    ))
+def reserve_slot(booking_data: dict) -> ReservationResult:
+    """
+    Atomically books a slot: the overlap check and the inserts
+    run in one BEGIN IMMEDIATE transaction, so concurrent
+    confirmations (across threads or processes) serialize on the
+    write lock and at most one of them gets an overlapping slot.
+    """
+    requested_minutes = normalize_time_to_minutes(booking_data["time"])
+    if requested_minutes is None:
+        return ReservationResult(ReservationStatus.INVALID_TIME)
 
-    customer_id = cursor.lastrowid
+    with transaction(immediate=True) as conn:
+        conflicts = _conflicting_times(
+            conn,
+            booking_data["date"],
+            requested_minutes,
+            booking_data["doctor_or_specialty"],
+        )
+        if conflicts:
+            return ReservationResult(
+                ReservationStatus.SLOT_TAKEN,
+                conflicting_times=tuple(conflicts),
+            )
 
-    # Insert booking
-    cursor.execute("""
-        INSERT INTO bookings (customer_id, booking_type, date, time, status)
-        VALUES (?, ?, ?, ?, ?)
-    """, (
-        customer_id,
-        booking_data["doctor_or_specialty"],
-        booking_data["date"],
-        booking_data["time"],
-        "CONFIRMED",
-    ))
+        booking_id = _insert_booking(conn.cursor(), booking_data, requested_minutes)
 
-    booking_id = cursor.lastrowid
+    invalidate_day(booking_data["date"], booking_data["doctor_or_specialty"])
+    return ReservationResult(ReservationStatus.RESERVED, booking_id=booking_id)
 
-    conn.commit()
-    conn.close()
 
-    return booking_id
+def safe_save_booking(booking_data: dict):
+    """
+    Final safety check before saving booking.
+    Prevents double-booking for the same
+    date, time slot, and specialty.
+    Returns the booking id, or None if the slot is taken.
+    """
+    return reserve_slot(booking_data).booking_id
 
 
 
@@ -144,9 +177,6 @@ def send_confirmation_email(to_email: str, subject: str, body: str) -> bool:
 # TIME & SLOT UTILITIES
 
 
-SLOT_DURATION_MINUTES = 30
-
-
 def normalize_time_to_minutes(time_str: str) -> int | None:
     """
     Converts time string like:
@@ -192,29 +222,45 @@ def is_slot_available(
     if requested_minutes is None:
         return True  # Let validation handle bad formats elsewhere
 
-    conn = get_connection()
-    cursor = conn.cursor()
+    with connection() as conn:
+        conflicts = _conflicting_times(
+            conn, date, requested_minutes, doctor_or_specialty
+        )
 
-    cursor.execute("""
-        SELECT time
-        FROM bookings
-        WHERE date = ?
-        AND booking_type = ?
-    """, (date, doctor_or_specialty))
+    return not conflicts
 
-    existing_times = cursor.fetchall()
-    conn.close()
 
-    for (existing_time,) in existing_times:
-        existing_minutes = normalize_time_to_minutes(existing_time)
-        if existing_minutes is None:
-            continue
+def _conflicting_times(
+    conn,
+    date: str,
+    requested_minutes: int,
+    doctor_or_specialty: str
+) -> list[str]:
+    """
+    Times of existing bookings on the same date and specialty
+    whose 30 minute slot overlaps one starting at requested_minutes.
+    """
+    # Bookings are at most SLOT_DURATION_MINUTES long, so the lower
+    # bound on start_minute keeps the index range scan to the few
+    # rows around the requested time however full the day is.
+    rows = conn.execute("""
+        SELECT time
+        FROM bookings
+        WHERE booking_type = ?
+        AND date = ?
+        AND start_minute > ?
+        AND start_minute < ?
+        AND end_minute > ?
+    """, (
+        doctor_or_specialty,
+        date,
+        requested_minutes - SLOT_DURATION_MINUTES,
+        requested_minutes + SLOT_DURATION_MINUTES,
+        requested_minutes,
+    )).fetchall()
 
-        # Check overlap (30 min slot)
-        if abs(existing_minutes - requested_minutes) < SLOT_DURATION_MINUTES:
-            return False
+    return [existing_time for (existing_time,) in rows]
 
-    return True
 
 def suggest_nearby_slots(
     date: str,
@@ -223,30 +269,17 @@ def suggest_nearby_slots(
     max_suggestions: int = 2
 ) -> list[str]:
     """
-    Suggests nearby available time slots
-    (±30 minutes) for the same date and specialty.
+    Suggests the available time slots nearest to time_str
+    for the same date and specialty within clinic hours,
+    on a 30 minute grid through the requested time.
     """
 
     base_minutes = normalize_time_to_minutes(time_str)
     if base_minutes is None:
         return []
 
-    suggestions = []
-    offsets = [-SLOT_DURATION_MINUTES, SLOT_DURATION_MINUTES]
-
-    for offset in offsets:
-        candidate = base_minutes + offset
-
-        # Working hours safety (00:00 - 23:30)
-        if candidate < 0 or candidate > (23 * 60 + 30):
-            continue
-
-        candidate_time = minutes_to_time_str(candidate)
-
-        if is_slot_available(date, candidate_time, doctor_or_specialty):
-            suggestions.append(candidate_time)
-
-        if len(suggestions) >= max_suggestions:
-            break
-
-    return suggestions
+    day = get_day_availability(date, doctor_or_specialty)
+    return [
+        minutes_to_time_str(minutes)
+        for minutes in day.nearest_free(base_minutes, max_suggestions)
+    ]
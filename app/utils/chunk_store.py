@@ -0,0 +1,228 @@
+import json
+import os
+import struct
+from collections.abc import Mapping
+from pathlib import Path
+
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_core.documents import Document
+
+
+# File layout:
+#   MAGIC | uint64 header length | JSON header | padding | sections...
+# Every section is 8-byte aligned so it can be viewed in place
+# from a single read-only memory map.
+MAGIC = b"CHUNKS1\n"
+ALIGNMENT = 8
+INT_MISSING = np.iinfo(np.int64).min
+
+
+def _column_kind(values) -> str:
+    present = [v for v in values if v is not None]
+    if present and all(isinstance(v, int) and not isinstance(v, bool) for v in present):
+        return "int"
+    if present and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        return "float"
+    return "category"
+
+
+def _encode_strings(strings: list[str]):
+    """
+    Returns (utf-8 blob, int64 offsets of length n + 1).
+    """
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def write_chunk_store(path: Path, ids: list[str], documents: list[Document]):
+    """
+    Writes chunk ids, texts and metadata in index order to a single
+    file, atomically replacing any previous version.
+    """
+    sections = {}
+    columns = {}
+
+    sections["texts"], sections["text_offsets"] = _encode_strings(
+        [doc.page_content for doc in documents]
+    )
+    sections["ids"], sections["id_offsets"] = _encode_strings(ids)
+    # Row numbers sorted by id, for binary search by id
+    sections["id_order"] = np.array(
+        sorted(range(len(ids)), key=lambda row: ids[row].encode("utf-8")),
+        dtype=np.int64,
+    )
+
+    keys = sorted({key for doc in documents for key in doc.metadata})
+    for key in keys:
+        values = [doc.metadata.get(key) for doc in documents]
+        kind = _column_kind(values)
+
+        if kind == "int":
+            column = np.array(
+                [INT_MISSING if v is None else v for v in values], dtype=np.int64
+            )
+            columns[key] = {"kind": kind}
+        elif kind == "float":
+            column = np.array(
+                [np.nan if v is None else v for v in values], dtype=np.float64
+            )
+            columns[key] = {"kind": kind}
+        else:
+            categories = {}
+            codes = np.empty(len(values), dtype=np.int32)
+            for row, value in enumerate(values):
+                if value is None:
+                    codes[row] = -1
+                else:
+                    codes[row] = categories.setdefault(json.dumps(value), len(categories))
+            column = codes
+            columns[key] = {
+                "kind": kind,
+                "values": [json.loads(v) for v in categories],
+            }
+
+        sections[f"column:{key}"] = column
+
+    # Lay sections out after the header
+    layout = {}
+    offset = 0
+    for name, array in sections.items():
+        layout[name] = [offset, array.nbytes, array.dtype.str]
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+    header = json.dumps({
+        "count": len(ids),
+        "sections": layout,
+        "columns": columns,
+    }).encode("utf-8")
+    data_start = len(MAGIC) + 8 + len(header)
+    padding = -data_start % ALIGNMENT
+
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header) + padding))
+        f.write(header)
+        f.write(b" " * padding)
+        for name, array in sections.items():
+            f.write(array.tobytes())
+            f.write(b"\0" * (-array.nbytes % ALIGNMENT))
+    os.replace(tmp_path, path)
+
+
+class ChunkStore:
+    """
+    Read-only view of a chunk file through one memory map.
+    Nothing is decoded until a chunk is requested.
+    """
+
+    def __init__(self, path: Path):
+        self._buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(self._buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"Not a chunk store: {path}")
+
+        header_start = len(MAGIC) + 8
+        (header_len,) = struct.unpack(
+            "<Q", bytes(self._buffer[len(MAGIC):header_start])
+        )
+        header = json.loads(
+            bytes(self._buffer[header_start:header_start + header_len])
+        )
+        self._data_start = header_start + header_len
+        self.count = header["count"]
+        self._columns = header["columns"]
+        self._sections = {
+            name: self._section(*spec) for name, spec in header["sections"].items()
+        }
+
+    def _section(self, offset: int, nbytes: int, dtype: str) -> np.ndarray:
+        start = self._data_start + offset
+        return self._buffer[start:start + nbytes].view(np.dtype(dtype))
+
+    def _string(self, blob: str, offsets: str, row: int) -> str:
+        data = self._sections[blob]
+        offsets = self._sections[offsets]
+        return bytes(data[offsets[row]:offsets[row + 1]]).decode("utf-8")
+
+    def get_id(self, row: int) -> str:
+        return self._string("ids", "id_offsets", row)
+
+    def find_row(self, chunk_id: str):
+        """
+        Binary search over ids sorted bytewise; None if absent.
+        """
+        target = chunk_id.encode("utf-8")
+        order = self._sections["id_order"]
+        offsets = self._sections["id_offsets"]
+        data = self._sections["ids"]
+
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            row = order[mid]
+            candidate = bytes(data[offsets[row]:offsets[row + 1]])
+            if candidate < target:
+                lo = mid + 1
+            elif candidate > target:
+                hi = mid
+            else:
+                return int(row)
+        return None
+
+    def get_document(self, row: int) -> Document:
+        metadata = {}
+        for key, spec in self._columns.items():
+            value = self._sections[f"column:{key}"][row]
+            if spec["kind"] == "int":
+                if value != INT_MISSING:
+                    metadata[key] = int(value)
+            elif spec["kind"] == "float":
+                if not np.isnan(value):
+                    metadata[key] = float(value)
+            elif value >= 0:
+                metadata[key] = spec["values"][value]
+
+        return Document(
+            page_content=self._string("texts", "text_offsets", row),
+            metadata=metadata,
+        )
+
+
+class ChunkIdMap(Mapping):
+    """
+    index position -> chunk id, decoded on access.
+    Stands in for the dict langchain's FAISS keeps in memory.
+    """
+
+    def __init__(self, store: ChunkStore):
+        self._store = store
+
+    def __getitem__(self, row: int) -> str:
+        if not 0 <= row < self._store.count:
+            raise KeyError(row)
+        return self._store.get_id(row)
+
+    def __iter__(self):
+        return iter(range(self._store.count))
+
+    def __len__(self) -> int:
+        return self._store.count
+
+
+class ChunkDocstore(Docstore):
+    """
+    Read-only docstore building Documents on demand.
+    """
+
+    def __init__(self, store: ChunkStore):
+        self._store = store
+
+    def search(self, search: str):
+        row = self._store.find_row(search)
+        if row is None:
+            return f"ID {search} not found."
+        return self._store.get_document(row)
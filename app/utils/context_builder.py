@@ -0,0 +1,212 @@
+import re
+import threading
+
+
+# Passages sharing this fraction of the smaller one's word shingles
+# are treated as near-duplicates
+NEAR_DUPLICATE_THRESHOLD = 0.8
+SHINGLE_WORDS = 5
+PASSAGE_SEPARATOR = "\n\n"
+
+_WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+_stats_lock = threading.Lock()
+_stats = {
+    "queries": 0,
+    "raw_tokens": 0,
+    "packed_tokens": 0,
+    "tokens_saved": 0,
+    "last": None,
+}
+
+
+def make_token_counter(embeddings=None):
+    """
+    Returns a text -> token count function using the local
+    sentence-transformers tokenizer when one is loaded, otherwise
+    a word/punctuation estimate. Neither is the LLM's own
+    tokenizer, so budgets are approximate.
+    """
+    client = getattr(embeddings, "client", None)
+    tokenizer = getattr(client, "tokenizer", None)
+
+    if tokenizer is not None:
+        def count(text: str) -> int:
+            encoded = tokenizer(text, add_special_tokens=False, verbose=False)
+            return len(encoded["input_ids"])
+        return count
+
+    def estimate(text: str) -> int:
+        return len(_WORD_PATTERN.findall(text))
+    return estimate
+
+
+def merge_chunks(docs) -> list[dict]:
+    """
+    Merges chunks of the same document whose character ranges
+    overlap or touch into single passages, using the document key
+    and start_index/end_index metadata written at ingestion (indexes
+    built before the key was recorded fall back to the filename).
+    Chunks without offsets are kept as they are. Passages keep the
+    best rank of their chunks.
+    """
+    passages = []
+    spans = {}  # document -> passages with offsets, for merging
+
+    for rank, doc in enumerate(docs):
+        metadata = doc.metadata or {}
+        source = metadata.get("source")
+        document = metadata.get("document") or source
+        start = metadata.get("start_index")
+        end = metadata.get("end_index")
+
+        passage = {
+            "text": doc.page_content,
+            "rank": rank,
+            "source": source,
+            "start": start,
+            "end": end,
+            "chunks": 1,
+        }
+        if document is None or start is None or end is None:
+            passages.append(passage)
+        else:
+            spans.setdefault(document, []).append(passage)
+
+    for document_passages in spans.values():
+        document_passages.sort(key=lambda p: p["start"])
+        current = document_passages[0]
+
+        for passage in document_passages[1:]:
+            if passage["start"] > current["end"]:
+                passages.append(current)
+                current = passage
+                continue
+
+            # Offsets are exact, so the overlap is a prefix of the next chunk
+            if passage["end"] > current["end"]:
+                current["text"] += passage["text"][current["end"] - passage["start"]:]
+                current["end"] = passage["end"]
+            current["rank"] = min(current["rank"], passage["rank"])
+            current["chunks"] += passage["chunks"]
+
+        passages.append(current)
+
+    passages.sort(key=lambda p: p["rank"])
+    return passages
+
+
+def _shingles(text: str) -> set:
+    words = text.lower().split()
+    if len(words) <= SHINGLE_WORDS:
+        return {" ".join(words)}
+    return {
+        " ".join(words[i:i + SHINGLE_WORDS])
+        for i in range(len(words) - SHINGLE_WORDS + 1)
+    }
+
+
+def drop_near_duplicates(passages: list[dict], threshold: float = NEAR_DUPLICATE_THRESHOLD):
+    """
+    Keeps passages in order, dropping any whose shingles mostly
+    appear in an already kept (more relevant) passage or which
+    mostly contain one. Returns (kept, dropped count).
+    """
+    kept = []
+    kept_shingles = []
+
+    for passage in passages:
+        shingles = _shingles(passage["text"])
+        duplicate = False
+        for other in kept_shingles:
+            smaller = min(len(shingles), len(other))
+            if smaller and len(shingles & other) / smaller >= threshold:
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append(passage)
+            kept_shingles.append(shingles)
+
+    return kept, len(passages) - len(kept)
+
+
+def _truncate(text: str, budget: int, count) -> str:
+    """
+    Longest word prefix of text fitting in budget tokens.
+    """
+    words = text.split(" ")
+    lo, hi = 0, len(words)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count(" ".join(words[:mid])) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return " ".join(words[:lo])
+
+
+def build_context(docs, token_budget: int, count=None) -> tuple[str, dict]:
+    """
+    Builds the prompt context from retrieved docs (most relevant
+    first): merges overlapping chunks, drops near-duplicates and
+    packs passages by relevance until token_budget is reached.
+    Returns (context, stats); stats include tokens saved compared
+    to joining the chunks verbatim.
+    """
+    count = count or make_token_counter()
+    separator_tokens = count(PASSAGE_SEPARATOR)
+
+    raw_tokens = count(PASSAGE_SEPARATOR.join(doc.page_content for doc in docs))
+
+    passages = merge_chunks(docs)
+    merged = len(docs) - len(passages)
+    passages, duplicates = drop_near_duplicates(passages)
+
+    packed = []
+    used = 0
+    over_budget = 0
+    for passage in passages:
+        tokens = count(passage["text"]) + (separator_tokens if packed else 0)
+        if used + tokens <= token_budget:
+            packed.append(passage["text"])
+            used += tokens
+        elif not packed:
+            # Never send an empty context because the best passage is long
+            packed.append(_truncate(passage["text"], token_budget, count))
+            used = count(packed[0])
+        else:
+            over_budget += 1
+
+    context = PASSAGE_SEPARATOR.join(packed)
+    packed_tokens = count(context)
+
+    stats = {
+        "chunks": len(docs),
+        "passages": len(packed),
+        "merged_chunks": merged,
+        "duplicates_dropped": duplicates,
+        "over_budget_dropped": over_budget,
+        "token_budget": token_budget,
+        "raw_tokens": raw_tokens,
+        "packed_tokens": packed_tokens,
+        "tokens_saved": max(raw_tokens - packed_tokens, 0),
+    }
+    _record_stats(stats)
+    return context, stats
+
+
+def _record_stats(stats: dict):
+    with _stats_lock:
+        _stats["queries"] += 1
+        _stats["raw_tokens"] += stats["raw_tokens"]
+        _stats["packed_tokens"] += stats["packed_tokens"]
+        _stats["tokens_saved"] += stats["tokens_saved"]
+        _stats["last"] = stats
+
+
+def get_context_stats() -> dict:
+    """
+    Returns cumulative token savings and the last query's stats.
+    """
+    with _stats_lock:
+        return dict(_stats)
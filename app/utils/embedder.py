@@ -0,0 +1,140 @@
+import threading
+import time
+
+import numpy as np
+
+
+# Texts per forward pass; larger batches amortize tokenizer and
+# matmul overhead on CPU at the cost of peak activation memory.
+ENCODE_BATCH_SIZE = 64
+
+_stats_lock = threading.Lock()
+_throughput = {
+    "chunks": 0,
+    "seconds": 0.0,
+    "calls": 0,
+    "last_chunks_per_second": 0.0,
+}
+
+
+def _encode_batch(embeddings, texts, batch_size: int):
+    """
+    Encodes one batch with the sentence-transformers client when
+    available, falling back to the generic langchain interface.
+    """
+    client = getattr(embeddings, "client", None)
+
+    if client is not None and hasattr(client, "encode"):
+        return client.encode(
+            texts,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+
+    return embeddings.embed_documents(texts)
+
+
+def _encoded_batches(embeddings, texts, rows: list[int], batch_size: int, pool):
+    """
+    Yields (rows slice, float32 vectors) for texts[rows], batch_size
+    rows at a time.
+    """
+    if pool is not None:
+        # One call for everything: the pool splits the list into chunks
+        # for its workers itself, and every call pays its dispatch cost
+        encoded = np.asarray(
+            embeddings.client.encode_multi_process(
+                [texts[i] for i in rows], pool, batch_size=batch_size
+            ),
+            dtype=np.float32,
+        )
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size], encoded[start:start + batch_size]
+        return
+
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        encoded = _encode_batch(embeddings, [texts[i] for i in batch], batch_size)
+        yield batch, np.asarray(encoded, dtype=np.float32)
+
+
+def embed_texts(
+    embeddings,
+    texts: list[str],
+    batch_size: int = ENCODE_BATCH_SIZE,
+    pool=None,
+    cache=None,
+) -> np.ndarray:
+    """
+    Embeds texts into a preallocated (len(texts), dim) float32 array
+    of L2-normalized rows. Pass a pool from
+    embedding_registry.get_encode_pool to spread work over processes,
+    and an EmbeddingCache to reuse vectors of previously seen texts.
+    """
+    started = time.perf_counter()
+
+    cached = {}
+    if cache is not None:
+        keys, cached = cache.get_many(texts)
+    missing = [i for i in range(len(texts)) if i not in cached]
+
+    vectors = None
+    if cached:
+        dim = len(next(iter(cached.values())))
+        vectors = np.empty((len(texts), dim), dtype=np.float32)
+        for i, vector in cached.items():
+            vectors[i] = vector
+
+    for rows, encoded in _encoded_batches(embeddings, texts, missing, batch_size, pool):
+        if vectors is None:
+            vectors = np.empty((len(texts), encoded.shape[1]), dtype=np.float32)
+        elif encoded.shape[1] != vectors.shape[1]:
+            raise ValueError(
+                f"Encoder dim {encoded.shape[1]} does not match "
+                f"cached dim {vectors.shape[1]}"
+            )
+
+        # Already normalized by the local encoder; cheap to redo for
+        # multi-process and fallback paths which may not be.
+        norms = np.linalg.norm(encoded, axis=1, keepdims=True)
+        np.divide(encoded, norms, out=encoded, where=norms > 0)
+        vectors[rows] = encoded
+
+        if cache is not None:
+            cache.put_many([keys[i] for i in rows], encoded)
+
+    if vectors is None:
+        return np.empty((0, 0), dtype=np.float32)
+
+    _record_throughput(len(texts), time.perf_counter() - started)
+    return vectors
+
+
+def embed_query(embeddings, query: str) -> np.ndarray:
+    """
+    Embeds a single query the same way as documents.
+    """
+    return embed_texts(embeddings, [query])[0]
+
+
+def _record_throughput(chunks: int, seconds: float):
+    with _stats_lock:
+        _throughput["chunks"] += chunks
+        _throughput["seconds"] += seconds
+        _throughput["calls"] += 1
+        if seconds > 0:
+            _throughput["last_chunks_per_second"] = chunks / seconds
+
+
+def get_embedding_throughput() -> dict:
+    """
+    Returns cumulative and most recent embedding throughput.
+    """
+    with _stats_lock:
+        stats = dict(_throughput)
+    stats["chunks_per_second"] = (
+        stats["chunks"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+    )
+    return stats
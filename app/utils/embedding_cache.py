@@ -0,0 +1,218 @@
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+
+
+BASE_EMBEDDING_CACHE_DIR = Path("/tmp/embedding_cache")
+# SQLite limits the number of bound parameters per statement
+LOOKUP_BATCH_SIZE = 500
+# Embedded once per cache lookup to tell encoders apart: the same model
+# name with other weights, or a fake encoder, must not share vectors
+FINGERPRINT_PROBE = "embedding cache fingerprint probe"
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+def encoder_signature(embeddings) -> tuple[int, str]:
+    """
+    Returns (dim, fingerprint) of an encoder from one probe
+    embedding, rounded so float noise between runs does not
+    change the fingerprint.
+    """
+    probe = np.asarray(embeddings.embed_query(FINGERPRINT_PROBE), dtype=np.float32)
+    # + 0.0 folds -0.0 into 0.0
+    rounded = np.round(probe, 4).astype(np.float32) + np.float32(0.0)
+    return len(probe), hashlib.sha1(rounded.tobytes()).hexdigest()[:16]
+
+
+class EmbeddingCache:
+    """
+    On-disk cache of chunk embeddings for one encoder, identified
+    by model name, dimension and fingerprint.
+
+    Vectors are appended to a flat float32 file that is read through
+    a memory map; an SQLite table maps sha256(text) to a row number.
+    Writers serialize on an SQLite write lock, so several processes
+    can share the same cache directory.
+    """
+
+    def __init__(self, model_name: str, dim: int, fingerprint: str = "", base_dir: Path = None):
+        if base_dir is None:
+            base_dir = BASE_EMBEDDING_CACHE_DIR
+        slug = hashlib.sha1(
+            f"{model_name}\0{dim}\0{fingerprint}".encode("utf-8")
+        ).hexdigest()[:16]
+        self.model_name = model_name
+        self.dim = dim
+        self.cache_dir = Path(base_dir) / slug
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.cache_dir / "vectors.f32"
+        self.vectors_path.touch(exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.cache_dir / "index.sqlite",
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS meta (
+                name TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS vectors (
+                key BLOB PRIMARY KEY,
+                row INTEGER NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO meta (name, value) VALUES (?, ?)",
+            [("model_name", model_name), ("dim", str(dim)), ("fingerprint", fingerprint)],
+        )
+
+        stored_dim = self._read_dim()
+        if stored_dim != dim:
+            self._conn.close()
+            raise ValueError(
+                f"Embedding cache {self.cache_dir} holds dim {stored_dim}, expected {dim}"
+            )
+
+        self._mmap = None
+        self.hits = 0
+        self.misses = 0
+
+    def _read_dim(self):
+        row = self._conn.execute(
+            "SELECT value FROM meta WHERE name = 'dim'"
+        ).fetchone()
+        return int(row[0]) if row else None
+
+    def _vectors(self, min_rows: int) -> np.ndarray:
+        """
+        Returns a read-only memory map covering at least min_rows rows,
+        remapping only when the file has grown past the current map.
+        """
+        if self._mmap is None or self._mmap.shape[0] < min_rows:
+            rows = self.vectors_path.stat().st_size // (self.dim * 4)
+            self._mmap = np.memmap(
+                self.vectors_path,
+                dtype=np.float32,
+                mode="r",
+                shape=(rows, self.dim),
+            )
+        return self._mmap
+
+    def lookup(self, keys: list[bytes]) -> dict:
+        """
+        Returns {key: row} for the keys present in the cache.
+        """
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+                batch = keys[start:start + LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                found.update(self._conn.execute(
+                    f"SELECT key, row FROM vectors WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall())
+        return found
+
+    def get_many(self, texts: list[str]):
+        """
+        Returns (keys, {index: vector}) for the texts already cached.
+        """
+        keys = [text_key(text) for text in texts]
+
+        rows = self.lookup(keys)
+        cached = {}
+        if rows:
+            vectors = self._vectors(max(rows.values()) + 1)
+            for i, key in enumerate(keys):
+                row = rows.get(key)
+                if row is not None:
+                    cached[i] = vectors[row]
+
+        self.hits += len(cached)
+        self.misses += len(texts) - len(cached)
+        return keys, cached
+
+    def put_many(self, keys: list[bytes], vectors: np.ndarray):
+        """
+        Appends vectors for keys that are not cached yet.
+        """
+        if len(keys) == 0:
+            return
+
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+                    raise ValueError(
+                        f"Embedding shape {vectors.shape} does not match "
+                        f"cache dim {self.dim}"
+                    )
+
+                row_bytes = self.dim * 4
+                with open(self.vectors_path, "r+b") as f:
+                    # Drop any partial row left by an interrupted writer
+                    next_row = f.seek(0, 2) // row_bytes
+                    f.truncate(next_row * row_bytes)
+                    f.seek(next_row * row_bytes)
+                    f.write(vectors.tobytes())
+
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO vectors (key, row) VALUES (?, ?)",
+                    [(key, next_row + i) for i, key in enumerate(keys)],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+        return {
+            "model_name": self.model_name,
+            "dim": self.dim,
+            "entries": entries,
+            "bytes": self.vectors_path.stat().st_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model_name: str, embeddings) -> EmbeddingCache | None:
+    """
+    Returns the process-wide embedding cache for the encoder
+    embeddings (loaded as model_name) under the current
+    BASE_EMBEDDING_CACHE_DIR, or None if it cannot be opened.
+    """
+    dim, fingerprint = encoder_signature(embeddings)
+    key = (model_name, dim, fingerprint, Path(BASE_EMBEDDING_CACHE_DIR))
+
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            try:
+                cache = EmbeddingCache(model_name, dim, fingerprint, base_dir=key[3])
+            except Exception as e:
+                print("Embedding cache error:", e)
+                return None
+            _caches[key] = cache
+        return cache
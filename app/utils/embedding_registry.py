@@ -0,0 +1,160 @@
+import atexit
+import threading
+import time
+
+from langchain_community.embeddings import HuggingFaceEmbeddings
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+# Process-wide registry: one loaded model per name, shared by every
+# Streamlit session and script rerun in this process.
+_models = {}
+_model_locks = {}
+_stats = {}
+_warm_threads = {}
+_encode_pools = {}
+_registry_lock = threading.Lock()
+
+
+def _current_rss_bytes() -> int:
+    """
+    Returns the resident memory of this process in bytes.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * resource.getpagesize()
+    except Exception:
+        if resource is None:
+            return 0
+        # ru_maxrss is a peak value in KiB, good enough as a fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _get_model_lock(model_name: str) -> threading.Lock:
+    with _registry_lock:
+        if model_name not in _model_locks:
+            _model_locks[model_name] = threading.Lock()
+        return _model_locks[model_name]
+
+
+def get_embeddings(model_name: str, source: str = "lazy") -> HuggingFaceEmbeddings:
+    """
+    Returns the shared embeddings model for model_name,
+    loading it on first use. Safe to call from several threads:
+    concurrent callers wait for a single load.
+    """
+    model = _models.get(model_name)
+    if model is not None:
+        _stats[model_name]["requests"] += 1
+        return model
+
+    with _get_model_lock(model_name):
+        model = _models.get(model_name)
+        if model is not None:
+            _stats[model_name]["requests"] += 1
+            return model
+
+        rss_before = _current_rss_bytes()
+        started = time.perf_counter()
+
+        model = HuggingFaceEmbeddings(model_name=model_name)
+
+        load_seconds = time.perf_counter() - started
+        rss_after = _current_rss_bytes()
+
+        _stats[model_name] = {
+            "load_seconds": load_seconds,
+            "rss_delta_bytes": max(rss_after - rss_before, 0),
+            "rss_after_bytes": rss_after,
+            "loaded_by": source,
+            "loaded_at": time.time(),
+            "requests": 1,
+        }
+        _models[model_name] = model
+        return model
+
+
+def warm_start(model_name: str) -> threading.Thread | None:
+    """
+    Loads model_name in a background thread so the first
+    query does not pay the cold-start cost.
+    Returns None if the model is already loaded or loading.
+    """
+    with _registry_lock:
+        if model_name in _models:
+            return None
+        thread = _warm_threads.get(model_name)
+        if thread is not None and thread.is_alive():
+            return None
+
+        def _load():
+            try:
+                get_embeddings(model_name, source="warm_start")
+            except Exception as e:
+                # A failed warm start falls back to a lazy load later
+                print("Embedding warm start error:", e)
+
+        thread = threading.Thread(
+            target=_load,
+            name=f"warm-{model_name}",
+            daemon=True,
+        )
+        _warm_threads[model_name] = thread
+
+    thread.start()
+    return thread
+
+
+def get_encode_pool(model_name: str, workers: int):
+    """
+    Returns a sentence-transformers multi-process encode pool
+    for model_name with the given number of CPU workers,
+    started once per process and stopped at exit.
+    Returns None when workers < 2 or the backend has no pool support.
+    """
+    if workers < 2:
+        return None
+
+    model = get_embeddings(model_name)
+    client = getattr(model, "client", None)
+    if client is None or not hasattr(client, "start_multi_process_pool"):
+        return None
+
+    with _get_model_lock(model_name):
+        pool = _encode_pools.get(model_name)
+        if pool is None:
+            pool = client.start_multi_process_pool(
+                target_devices=["cpu"] * workers
+            )
+            _encode_pools[model_name] = pool
+        return pool
+
+
+def _stop_encode_pools():
+    for model_name, pool in list(_encode_pools.items()):
+        try:
+            _models[model_name].client.stop_multi_process_pool(pool)
+        except Exception:
+            pass
+    _encode_pools.clear()
+
+
+atexit.register(_stop_encode_pools)
+
+
+def is_loaded(model_name: str) -> bool:
+    return model_name in _models
+
+
+def get_embedding_stats() -> dict:
+    """
+    Returns load time and memory statistics per model.
+    load_seconds / rss_delta_bytes are the one-off cold-start cost;
+    requests counts how many lookups reused the loaded model.
+    """
+    return {name: dict(stats) for name, stats in _stats.items()}
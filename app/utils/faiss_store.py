@@ -1,51 +1,292 @@
+import itertools
+import json
 import os
 import shutil
+import threading
+import time
 from pathlib import Path
+
+import faiss
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
 
+from utils.chunk_store import ChunkDocstore, ChunkIdMap, ChunkStore, write_chunk_store
+from utils.index_cache import IndexCache
+from utils.index_factory import apply_search_params
+
 
 BASE_FAISS_DIR = Path("/tmp/faiss_indexes")
+MANIFEST_FILENAME = "manifest.json"
+INDEX_FILENAME = "index.faiss"
+CHUNKS_FILENAME = "chunks.bin"
+# Written by older versions through pickle; never loaded
+LEGACY_DOCSTORE_FILENAME = "index.pkl"
+INDEX_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Open saved indexes memory-mapped so concurrent sessions share the
+# OS page cache instead of each holding a private copy of the vectors.
+MMAP_INDEXES = True
+
+# Loaded indexes shared across reruns; bumped versions make
+# entries written before a save/delete unreachable.
+_index_cache = IndexCache(INDEX_CACHE_MAX_BYTES)
+_index_versions = {}
+# Shared by all sessions so a version is never reused, even after a
+# session's entry is dropped
+_version_counter = itertools.count(1)
+_versions_lock = threading.Lock()
+# session_id -> time.time() of the last load or save in this process
+_last_access = {}
+
+
+def _bump_index_version(session_id: str) -> int:
+    with _versions_lock:
+        version = next(_version_counter)
+        _index_versions[session_id] = version
+        return version
+
+
+def get_index_version(session_id: str) -> int:
+    """
+    Returns the in-process version of the session index.
+    Changes every time the index is saved or deleted.
+    """
+    return _index_versions.get(session_id, 0)
 
 
-def get_session_faiss_dir(session_id: str) -> Path:
+def estimate_vector_store_bytes(vector_store: FAISS, include_vectors: bool = True) -> int:
     """
-    Returns the FAISS directory path for a given session.
+    Rough private memory of a vector store: encoded vectors
+    (unless memory-mapped) plus the text held by the docstore.
+    """
+    nbytes = 0
+    index = vector_store.index
+    if include_vectors:
+        code_size = getattr(index, "code_size", 0) or index.d * 4
+        nbytes += index.ntotal * code_size
+
+    docs = getattr(vector_store.docstore, "_dict", {})
+    nbytes += sum(len(doc.page_content) for doc in docs.values())
+    return nbytes
+
+
+def get_index_cache_stats() -> dict:
+    return _index_cache.stats()
+
+
+def get_last_access(session_id: str) -> float:
+    """
+    Returns when the session index was last loaded or saved,
+    falling back to the directory mtime for sessions this
+    process has not touched (e.g. after a restart).
+    """
+    last_access = _last_access.get(session_id)
+    if last_access is not None:
+        return last_access
+    try:
+        return (BASE_FAISS_DIR / session_id).stat().st_mtime
+    except OSError:
+        return 0.0
+
+
+def get_session_faiss_dir(session_id: str, create: bool = False) -> Path:
+    """
+    Returns the FAISS directory path for a given session,
+    creating it only when create=True (i.e. when writing).
     """
     session_dir = BASE_FAISS_DIR / session_id
-    session_dir.mkdir(parents=True, exist_ok=True)
+    if create:
+        session_dir.mkdir(parents=True, exist_ok=True)
     return session_dir
 
 
-def save_faiss_index(vector_store: FAISS, session_id: str):
+def _atomic_write(path: Path, write):
+    """
+    Writes through a temporary file and renames it into place, so
+    readers that memory-mapped the old file keep a valid mapping.
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    write(str(tmp_path))
+    os.replace(tmp_path, path)
+
+
+def _mmap_flags(kind: str) -> int:
+    if not MMAP_INDEXES:
+        return 0
+    if kind == "ivf":
+        # Inverted lists are mapped; centroids are small
+        return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    # Flat codes (and HNSW storage) are mapped on faiss >= 1.10
+    return getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def save_faiss_index(vector_store: FAISS, session_id: str, manifest: dict = None):
     """
     Save FAISS index to disk for the session.
+    The manifest, if given, is written after the index so it
+    never describes vectors that are not on disk yet; its index
+    entry is updated with the on-disk bytes per vector.
     """
-    session_dir = get_session_faiss_dir(session_id)
-    vector_store.save_local(str(session_dir))
+    session_dir = get_session_faiss_dir(session_id, create=True)
+    index_path = session_dir / INDEX_FILENAME
+    _last_access[session_id] = time.time()
+
+    _atomic_write(index_path, lambda path: faiss.write_index(vector_store.index, path))
+
+    ids = [vector_store.index_to_docstore_id[i] for i in range(vector_store.index.ntotal)]
+    write_chunk_store(
+        session_dir / CHUNKS_FILENAME,
+        ids,
+        [vector_store.docstore.search(chunk_id) for chunk_id in ids],
+    )
 
+    legacy_path = session_dir / LEGACY_DOCSTORE_FILENAME
+    if legacy_path.exists():
+        legacy_path.unlink()
 
-def load_faiss_index(session_id: str, embeddings):
+    if manifest is not None:
+        index_params = manifest.setdefault("index", {})
+        if vector_store.index.ntotal:
+            index_params["bytes_per_vector"] = (
+                index_path.stat().st_size / vector_store.index.ntotal
+            )
+        save_manifest(session_id, manifest)
+
+    version = _bump_index_version(session_id)
+    if MMAP_INDEXES:
+        # The next query maps the file instead of keeping this private copy
+        _index_cache.invalidate(session_id)
+    else:
+        # Write-through: the next query reuses this object directly
+        _index_cache.put(
+            session_id,
+            version,
+            vector_store,
+            estimate_vector_store_bytes(vector_store),
+        )
+
+
+def load_manifest(session_id: str) -> dict:
+    """
+    Load the per-document manifest for the session.
+    Maps each ingested document key to its name and vector ids.
+    """
+    manifest_path = get_session_faiss_dir(session_id) / MANIFEST_FILENAME
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+
+    manifest.setdefault("documents", {})
+    return manifest
+
+
+def save_manifest(session_id: str, manifest: dict):
+    """
+    Atomically write the per-document manifest for the session.
+    """
+    session_dir = get_session_faiss_dir(session_id, create=True)
+    tmp_path = session_dir / (MANIFEST_FILENAME + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, session_dir / MANIFEST_FILENAME)
+
+
+def load_faiss_index(session_id: str, embeddings, writable: bool = False):
     """
-    Load FAISS index from disk for the session.
+    Load FAISS index for the session, from the in-memory
+    cache when possible and from disk otherwise.
+    Pass writable=True to get a private, modifiable copy
+    (never memory-mapped, never shared through the cache).
     """
+    version = get_index_version(session_id)
+    if not writable:
+        vector_store = _index_cache.get(session_id, version)
+        if vector_store is not None:
+            _last_access[session_id] = time.time()
+            return vector_store
+
     session_dir = get_session_faiss_dir(session_id)
     if not session_dir.exists():
         return None
+    _last_access[session_id] = time.time()
+
+    index_params = load_manifest(session_id).get("index", {})
+    mmap = MMAP_INDEXES and not writable
 
     try:
-        return FAISS.load_local(
-            str(session_dir),
-            embeddings,
-            allow_dangerous_deserialization=True,
+        index = faiss.read_index(
+            str(session_dir / INDEX_FILENAME),
+            _mmap_flags(index_params.get("kind", "flat")) if mmap else 0,
         )
+        chunks = ChunkStore(session_dir / CHUNKS_FILENAME)
     except Exception:
         return None
 
+    if chunks.count != index.ntotal:
+        # Caught between the index and chunk file being replaced
+        return None
+
+    if writable:
+        index_to_docstore_id = {row: chunks.get_id(row) for row in range(chunks.count)}
+        docstore = InMemoryDocstore({
+            chunk_id: chunks.get_document(row)
+            for row, chunk_id in index_to_docstore_id.items()
+        })
+    else:
+        index_to_docstore_id = ChunkIdMap(chunks)
+        docstore = ChunkDocstore(chunks)
+
+    apply_search_params(index, index_params)
+    vector_store = FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+    if not writable:
+        with _versions_lock:
+            # Not if the index was deleted while loading: its state is gone
+            if session_dir.exists():
+                _index_cache.put(
+                    session_id,
+                    version,
+                    vector_store,
+                    estimate_vector_store_bytes(vector_store, include_vectors=not mmap),
+                )
+    return vector_store
+
 
 def delete_faiss_index(session_id: str):
     """
     Delete FAISS index directory for the session.
     """
-    session_dir = BASE_FAISS_DIR / session_id
+    session_dir = get_session_faiss_dir(session_id)
     if session_dir.exists():
         shutil.rmtree(session_dir, ignore_errors=True)
+    forget_session(session_id)
+
+
+def forget_session(session_id: str) -> bool:
+    """
+    Drops the in-process state kept for a session (version, last
+    access, cached index) once it has no index directory.
+    Returns False if the directory exists.
+    """
+    with _versions_lock:
+        # A save writes the directory before bumping the version
+        # under this lock, so it cannot be forgotten mid-save
+        if get_session_faiss_dir(session_id).exists():
+            return False
+        _index_versions.pop(session_id, None)
+        _last_access.pop(session_id, None)
+        _index_cache.invalidate(session_id)
+        return True
+
+
+def forget_missing_sessions() -> int:
+    """
+    Drops in-process state of every session without an index
+    directory, e.g. sessions that only ever looked for one.
+    Returns the number of sessions forgotten.
+    """
+    with _versions_lock:
+        session_ids = set(_index_versions) | set(_last_access)
+    return sum(forget_session(session_id) for session_id in session_ids)
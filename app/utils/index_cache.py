@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+
+
+class IndexCache:
+    """
+    Process-wide LRU of loaded vector stores.
+
+    Entries are keyed by (session_id, version) and evicted
+    least-recently-used first once their estimated total size
+    exceeds max_bytes. An entry larger than max_bytes is not cached.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (session_id, version) -> (value, nbytes)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, session_id: str, version: int):
+        key = (session_id, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, session_id: str, version: int, value, nbytes: int):
+        with self._lock:
+            self._remove_session(session_id)
+            if nbytes > self.max_bytes:
+                return
+
+            self._entries[(session_id, version)] = (value, nbytes)
+            self._total_bytes += nbytes
+
+            while self._total_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_bytes
+                self.evictions += 1
+
+    def invalidate(self, session_id: str):
+        with self._lock:
+            self._remove_session(session_id)
+
+    def _remove_session(self, session_id: str):
+        stale = [key for key in self._entries if key[0] == session_id]
+        for key in stale:
+            _, nbytes = self._entries.pop(key)
+            self._total_bytes -= nbytes
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
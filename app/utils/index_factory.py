@@ -0,0 +1,212 @@
+import math
+
+import faiss
+import numpy as np
+
+
+INDEX_KINDS = ("flat", "ivf", "hnsw")
+# How vectors are encoded inside the index
+STORAGE_MODES = ("float32", "float16", "pq")
+
+# Exact search stays fast enough below this many vectors
+FLAT_MAX_VECTORS = 20_000
+# HNSW gives the best latency/recall in the middle range; above it
+# the graph's memory and build time favour IVF
+HNSW_MAX_VECTORS = 200_000
+
+IVF_NPROBE = 16
+IVF_TRAINING_POINTS_PER_LIST = 256
+# Retrain IVF centroids once the corpus outgrows the trained size
+IVF_RETRAIN_GROWTH = 4
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+# PQ needs ~39 training points per centroid (256 per sub-quantizer);
+# smaller corpora fall back to float16
+PQ_MIN_VECTORS = 10_000
+PQ_DIMS_PER_SUBQUANTIZER = 4
+PQ_TRAINING_POINTS = 65_536
+
+# Queries sampled to measure recall against exact search
+RECALL_SAMPLE_QUERIES = 200
+RECALL_K = 4
+
+
+def choose_index_kind(num_vectors: int) -> str:
+    """
+    Picks an index type for a corpus of num_vectors vectors.
+    """
+    if num_vectors < FLAT_MAX_VECTORS:
+        return "flat"
+    if num_vectors < HNSW_MAX_VECTORS:
+        return "hnsw"
+    return "ivf"
+
+
+def index_kind(index) -> str:
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    return "flat"
+
+
+def ivf_nlist(num_vectors: int) -> int:
+    # ~4*sqrt(n) lists, keeping at least 39 training points per list
+    return max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // 39))
+
+
+def pq_subquantizers(dim: int) -> int:
+    """
+    Largest divisor of dim giving at least
+    PQ_DIMS_PER_SUBQUANTIZER dimensions per sub-quantizer.
+    """
+    for m in range(dim // PQ_DIMS_PER_SUBQUANTIZER, 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def _codec(storage: str, dim: int) -> str:
+    if storage == "float16":
+        return "SQfp16"
+    if storage == "pq":
+        return f"PQ{pq_subquantizers(dim)}x8"
+    return "Flat"
+
+
+def build_index(vectors: np.ndarray, kind: str, storage: str = "float32"):
+    """
+    Builds and fills an L2 index of the given kind and storage mode.
+    Returns (index, params) where params holds what is needed to
+    search and later rebuild the index; it is persisted alongside it.
+    For anything but exact float32 search, params also records the
+    recall@4 measured against exact search on a sample of queries.
+    """
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown index kind: {kind}")
+    if storage not in STORAGE_MODES:
+        raise ValueError(f"Unknown storage mode: {storage}")
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    num_vectors, dim = vectors.shape
+
+    if storage == "pq" and num_vectors < PQ_MIN_VECTORS:
+        storage = "float16"
+
+    params = {"kind": kind, "storage": storage, "trained_on": num_vectors}
+    codec = _codec(storage, dim)
+
+    if kind == "flat":
+        index = faiss.index_factory(dim, codec)
+
+    elif kind == "hnsw":
+        index = faiss.index_factory(dim, f"HNSW{HNSW_M},{codec}")
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        params.update({
+            "m": HNSW_M,
+            "ef_construction": HNSW_EF_CONSTRUCTION,
+            "ef_search": HNSW_EF_SEARCH,
+        })
+
+    else:
+        nlist = ivf_nlist(num_vectors)
+        index = faiss.index_factory(dim, f"IVF{nlist},{codec}")
+        params.update({
+            "nlist": nlist,
+            "nprobe": min(IVF_NPROBE, nlist),
+        })
+
+    if not index.is_trained:
+        sample_size = min(num_vectors, PQ_TRAINING_POINTS)
+        if kind == "ivf":
+            sample_size = min(
+                num_vectors, params["nlist"] * IVF_TRAINING_POINTS_PER_LIST
+            )
+        sample = vectors
+        if sample_size < num_vectors:
+            rng = np.random.default_rng(0)
+            sample = vectors[rng.choice(num_vectors, sample_size, replace=False)]
+        index.train(sample)
+
+    apply_search_params(index, params)
+    index.add(vectors)
+
+    if kind != "flat" or storage != "float32":
+        params[f"recall_at_{RECALL_K}"] = measure_recall(index, vectors)
+
+    return index, params
+
+
+def measure_recall(index, vectors: np.ndarray, k: int = RECALL_K) -> float:
+    """
+    Recall@k of index against exact L2 search over vectors,
+    using a sample of slightly perturbed stored vectors as queries.
+    """
+    num_vectors, dim = vectors.shape
+    rng = np.random.default_rng(0)
+    sample = rng.choice(num_vectors, min(RECALL_SAMPLE_QUERIES, num_vectors), replace=False)
+    queries = vectors[sample] + 0.05 * rng.standard_normal((len(sample), dim)).astype(np.float32)
+
+    k = min(k, num_vectors)
+    _, truth = faiss.knn(queries, vectors, k)
+    _, found = index.search(queries, k)
+
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def apply_search_params(index, params: dict):
+    """
+    Applies persisted search-time parameters to a loaded index.
+    """
+    if isinstance(index, faiss.IndexIVF) and "nprobe" in params:
+        index.nprobe = params["nprobe"]
+    if isinstance(index, faiss.IndexHNSW) and "ef_search" in params:
+        index.hnsw.efSearch = params["ef_search"]
+
+
+def stores_exact_vectors(index) -> bool:
+    """
+    True if index keeps raw float32 vectors (Flat codec), so
+    read_vectors returns exactly what was added.
+    """
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    return isinstance(index, (faiss.IndexFlat, faiss.IndexIVFFlat))
+
+
+def read_vectors(index) -> np.ndarray:
+    """
+    Returns all vectors stored in index, in id order. Refuses
+    float16 / PQ indexes: rebuilding from decoded codes would add
+    quantization error on every rebuild.
+    """
+    if not stores_exact_vectors(index):
+        raise ValueError("Index stores lossy codes; rebuild from the original vectors")
+    if isinstance(index, faiss.IndexIVF):
+        index.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def needs_rebuild(index, params: dict, kind: str, storage: str = "float32") -> bool:
+    """
+    True if index should be rebuilt as kind/storage: either differs,
+    or an IVF index has outgrown the corpus it was trained on.
+    """
+    if index_kind(index) != kind:
+        return True
+
+    current_storage = params.get("storage", "float32")
+    if current_storage != storage:
+        # PQ falls back to float16 on small corpora; retry once it is big enough
+        pq_fallback = storage == "pq" and current_storage == "float16"
+        if not pq_fallback or index.ntotal >= PQ_MIN_VECTORS:
+            return True
+
+    if kind == "ivf":
+        trained_on = params.get("trained_on") or index.ntotal
+        return index.ntotal > trained_on * IVF_RETRAIN_GROWTH
+    return False
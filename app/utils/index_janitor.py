@@ -0,0 +1,131 @@
+import threading
+import time
+
+from utils.faiss_store import (
+    BASE_FAISS_DIR,
+    delete_faiss_index,
+    forget_missing_sessions,
+    get_last_access,
+)
+
+
+# Indexes untouched for this long are removed
+SESSION_TTL_SECONDS = 6 * 60 * 60
+# Total size of BASE_FAISS_DIR above which the oldest sessions go
+DISK_BUDGET_BYTES = 2 * 1024 * 1024 * 1024
+# Quota eviction never removes a session used more recently than this
+MIN_IDLE_SECONDS = 60
+JANITOR_INTERVAL_SECONDS = 5 * 60
+
+_janitor_thread = None
+_janitor_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {
+    "bytes_used": 0,
+    "sessions": 0,
+    "ttl_evictions": 0,
+    "quota_evictions": 0,
+    "forgotten_sessions": 0,
+    "runs": 0,
+    "last_run_at": None,
+}
+
+
+def _dir_size(path) -> int:
+    total = 0
+    for entry in path.rglob("*"):
+        try:
+            if entry.is_file():
+                total += entry.stat().st_size
+        except OSError:
+            pass
+    return total
+
+
+def sweep_session_indexes(now: float = None) -> dict:
+    """
+    Runs one eviction pass: drops sessions idle longer than
+    SESSION_TTL_SECONDS, then the least recently used sessions
+    until the total size fits in DISK_BUDGET_BYTES, then forgets
+    the in-process state of sessions without an index.
+    Returns the updated stats.
+    """
+    now = time.time() if now is None else now
+
+    sessions = []
+    if BASE_FAISS_DIR.exists():
+        for session_dir in BASE_FAISS_DIR.iterdir():
+            if session_dir.is_dir():
+                session_id = session_dir.name
+                sessions.append(
+                    [get_last_access(session_id), _dir_size(session_dir), session_id]
+                )
+
+    ttl_evictions = 0
+    kept = []
+    for last_access, size, session_id in sessions:
+        if now - last_access > SESSION_TTL_SECONDS:
+            delete_faiss_index(session_id)
+            ttl_evictions += 1
+        else:
+            kept.append((last_access, size, session_id))
+
+    # Oldest first
+    kept.sort()
+    bytes_used = sum(size for _, size, _ in kept)
+    quota_evictions = 0
+    remaining = []
+    for last_access, size, session_id in kept:
+        over_budget = bytes_used > DISK_BUDGET_BYTES
+        if over_budget and now - last_access > MIN_IDLE_SECONDS:
+            delete_faiss_index(session_id)
+            bytes_used -= size
+            quota_evictions += 1
+        else:
+            remaining.append(session_id)
+
+    forgotten = forget_missing_sessions()
+
+    with _stats_lock:
+        _stats["bytes_used"] = bytes_used
+        _stats["sessions"] = len(remaining)
+        _stats["ttl_evictions"] += ttl_evictions
+        _stats["quota_evictions"] += quota_evictions
+        _stats["forgotten_sessions"] += forgotten
+        _stats["runs"] += 1
+        _stats["last_run_at"] = now
+        return dict(_stats)
+
+
+def _run_janitor(interval: float):
+    while True:
+        try:
+            sweep_session_indexes()
+        except Exception as e:
+            # Never let a failed sweep stop future ones
+            print("Index janitor error:", e)
+        time.sleep(interval)
+
+
+def start_index_janitor(interval: float = JANITOR_INTERVAL_SECONDS) -> bool:
+    """
+    Starts the background janitor once per process.
+    Returns False if it is already running.
+    """
+    global _janitor_thread
+    with _janitor_lock:
+        if _janitor_thread is not None and _janitor_thread.is_alive():
+            return False
+        _janitor_thread = threading.Thread(
+            target=_run_janitor,
+            args=(interval,),
+            name="faiss-index-janitor",
+            daemon=True,
+        )
+        _janitor_thread.start()
+        return True
+
+
+def get_janitor_stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,219 @@
+"""
+Query plans and latency of the booking hot-path queries before and
+after the index migrations, on a synthetic database.
+
+    python benchmarks/bench_booking_queries.py --rows 1000000
+    python benchmarks/bench_booking_queries.py --rows 100000 --json plans.json
+
+Builds the schema at version 1 (tables only), loads --rows bookings,
+runs each query with EXPLAIN QUERY PLAN and timings, applies the
+remaining migrations and runs them again.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+import db.database as database
+from db.migrations import get_schema_version, migrate
+
+
+SPECIALTIES = [
+    "Cardiology", "Dermatology", "Neurology", "Pediatrics", "Orthopedics",
+    "Oncology", "Psychiatry", "Radiology", "Urology", "Ophthalmology",
+]
+DAYS = 3 * 365
+START_DATE = date(2024, 1, 1)
+INSERT_BATCH = 50_000
+
+
+def _time_text(minutes: int, rng: random.Random) -> str:
+    # The app stores both forms, depending on what the patient typed
+    hours, mins = divmod(minutes, 60)
+    if rng.random() < 0.5:
+        return f"{hours:02d}:{mins:02d}"
+    return f"{(hours - 1) % 12 + 1}:{mins:02d} {'AM' if hours < 12 else 'PM'}"
+
+
+def load_rows(rows: int, seed: int = 0):
+    rng = random.Random(seed)
+
+    def bookings():
+        for i in range(rows):
+            day = START_DATE + timedelta(days=rng.randrange(DAYS))
+            minutes = 9 * 60 + 30 * rng.randrange(16)
+            yield (
+                i + 1,
+                rng.choice(SPECIALTIES),
+                day.isoformat(),
+                _time_text(minutes, rng),
+                "CONFIRMED",
+            )
+
+    with database.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO customers (customer_id, name, email, phone) VALUES (?, ?, ?, ?)",
+            (
+                (i + 1, f"Patient {i}", f"patient{i}@example.com", "5550100123")
+                for i in range(rows)
+            ),
+        )
+
+    batch = []
+    for row in bookings():
+        batch.append(row)
+        if len(batch) == INSERT_BATCH:
+            _insert_bookings(batch)
+            batch = []
+    if batch:
+        _insert_bookings(batch)
+
+
+def _insert_bookings(batch):
+    with database.transaction() as conn:
+        conn.executemany(
+            """
+            INSERT INTO bookings (customer_id, booking_type, date, time, status)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            batch,
+        )
+
+
+def hot_queries(rows: int) -> dict:
+    """
+    The app's booking queries, with parameters hitting existing data,
+    and the schema version each one needs.
+    """
+    day = (START_DATE + timedelta(days=DAYS // 2)).isoformat()
+    return {
+        # tools.is_slot_available before migration 3
+        "slot_check": (
+            "SELECT time FROM bookings WHERE date = ? AND booking_type = ?",
+            (day, "Cardiology"),
+            1,
+        ),
+        # tools.is_slot_available / reserve_slot overlap check
+        "slot_overlap": (
+            """
+            SELECT time FROM bookings
+            WHERE booking_type = ? AND date = ?
+            AND start_minute > ? AND start_minute < ? AND end_minute > ?
+            """,
+            ("Cardiology", day, 600 - 30, 600 + 30, 600),
+            3,
+        ),
+        # bulk_io conflict recheck: one specialty's day in slot order
+        "slot_recheck": (
+            """
+            SELECT start_minute, end_minute FROM bookings
+            WHERE booking_type = ? AND date = ? AND start_minute IS NOT NULL
+            ORDER BY start_minute
+            """,
+            ("Cardiology", day),
+            3,
+        ),
+        # main.get_booking_stats
+        "day_count": (
+            "SELECT COUNT(*) FROM bookings b WHERE b.date = ?",
+            (day,),
+            1,
+        ),
+        # admin dashboard schedule for one day
+        "day_schedule": (
+            """
+            SELECT b.id, c.name, c.email, c.phone, b.booking_type, b.date, b.time
+            FROM bookings b
+            JOIN customers c ON b.customer_id = c.customer_id
+            WHERE b.date = ?
+            ORDER BY b.date, b.time
+            """,
+            (day,),
+            1,
+        ),
+        "email_lookup": (
+            "SELECT customer_id FROM customers WHERE email = ?",
+            (f"patient{rows // 2}@example.com",),
+            1,
+        ),
+    }
+
+
+def measure(queries: dict, repeats: int) -> dict:
+    """
+    Plan and median latency of each query the current schema supports.
+    """
+    results = {}
+    version = get_schema_version()
+    with database.connection() as conn:
+        for name, (sql, params, min_version) in queries.items():
+            if version < min_version:
+                continue
+            plan = [
+                row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            ]
+            timings = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                conn.execute(sql, params).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = {
+                "plan": plan,
+                "uses_index": any("USING" in step and "INDEX" in step for step in plan),
+                "median_ms": statistics.median(timings),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    args = parser.parse_args()
+
+    database.DB_PATH = Path(tempfile.mkdtemp(prefix="bench_booking_queries_")) / "booking.db"
+
+    migrate(target=1)
+    started = time.perf_counter()
+    load_rows(args.rows)
+    print(f"Loaded {args.rows} bookings in {time.perf_counter() - started:.1f}s")
+
+    queries = hot_queries(args.rows)
+    runs = {}
+    for label in ("before", "after"):
+        if label == "after":
+            started = time.perf_counter()
+            migrate()
+            print(f"Migrated to version {get_schema_version()} "
+                  f"in {time.perf_counter() - started:.1f}s")
+        runs[label] = measure(queries, args.repeats)
+
+    print(f"\n{'query':>15} {'before ms':>10} {'after ms':>10} {'speedup':>8}  plan after")
+    for name in queries:
+        after = runs["after"][name]["median_ms"]
+        plan = " | ".join(runs["after"][name]["plan"])
+        if name not in runs["before"]:
+            print(f"{name:>15} {'-':>10} {after:>10.3f} {'-':>8}  {plan}")
+            continue
+        before = runs["before"][name]["median_ms"]
+        print(f"{name:>15} {before:>10.3f} {after:>10.3f} {before / max(after, 1e-6):>7.0f}x  {plan}")
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            "rows": args.rows,
+            "schema_version": get_schema_version(),
+            "runs": runs,
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
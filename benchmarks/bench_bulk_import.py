@@ -0,0 +1,113 @@
+"""
+Bulk import throughput against one save_booking call per row, and
+export throughput, on a synthetic appointments file.
+
+    python benchmarks/bench_bulk_import.py --rows 100000
+    python benchmarks/bench_bulk_import.py --rows 20000 --chunk-rows 500 5000 --json import.json
+
+The per-row baseline only runs on the first --baseline-rows rows
+(one transaction each is slow); its rate is what matters.
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR / "app"))
+sys.path.append(str(ROOT_DIR))
+
+import db.database as database
+from db.models import create_tables
+
+
+SPECIALTIES = ["Cardiology", "Dermatology", "Neurology", "Pediatrics", "Orthopedics"]
+START_DATE = date(2030, 1, 1)
+SLOTS_PER_DAY = 16
+
+
+def write_file(path: Path, rows: int, patients: int):
+    """
+    rows conflict-free appointments, filling each specialty's
+    day slot by slot.
+    """
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "email", "phone", "doctor_or_specialty", "date", "time"])
+        for i in range(rows):
+            slot, specialty = divmod(i, len(SPECIALTIES))
+            day, slot = divmod(slot, SLOTS_PER_DAY)
+            minutes = 9 * 60 + 30 * slot
+            patient = i % patients
+            writer.writerow([
+                f"Patient {patient}",
+                f"patient{patient}@example.com",
+                "5550100123",
+                SPECIALTIES[specialty],
+                (START_DATE + timedelta(days=day)).isoformat(),
+                f"{minutes // 60:02d}:{minutes % 60:02d}",
+            ])
+
+
+def fresh_database(label: str):
+    database.DB_PATH = Path(tempfile.mkdtemp(prefix=f"bench_bulk_{label}_")) / "booking.db"
+    create_tables()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--patients", type=int, default=10_000)
+    parser.add_argument("--chunk-rows", type=int, nargs="+", default=[500, 5000])
+    parser.add_argument("--baseline-rows", type=int, default=2_000)
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    args = parser.parse_args()
+
+    from bulk_io import export_bookings, import_bookings, read_rows, validate_row
+    from tools import save_booking
+
+    path = Path(tempfile.mkdtemp(prefix="bench_bulk_")) / "appointments.csv"
+    write_file(path, args.rows, args.patients)
+
+    results = {}
+
+    fresh_database("baseline")
+    started = time.perf_counter()
+    for _, (_, row) in zip(range(args.baseline_rows), read_rows(str(path))):
+        save_booking(validate_row(row)[0])
+    seconds = time.perf_counter() - started
+    results["save_booking"] = {"rows": args.baseline_rows, "rows_per_second": args.baseline_rows / seconds}
+
+    for chunk_rows in args.chunk_rows:
+        fresh_database(f"chunk{chunk_rows}")
+        started = time.perf_counter()
+        report = import_bookings(str(path), chunk_rows=chunk_rows)
+        seconds = time.perf_counter() - started
+        results[f"import chunk={chunk_rows}"] = {
+            "rows": report.imported,
+            "rejected": report.rejected,
+            "rows_per_second": report.imported / seconds,
+        }
+
+    for fmt in ("csv", "jsonl"):
+        out = io.StringIO()
+        started = time.perf_counter()
+        written = export_bookings(out, fmt)
+        seconds = time.perf_counter() - started
+        results[f"export {fmt}"] = {"rows": written, "rows_per_second": written / seconds}
+
+    print(f"{'':>20} {'rows':>8} {'rows/s':>10}")
+    for name, result in results.items():
+        print(f"{name:>20} {result['rows']:>8} {result['rows_per_second']:>10.0f}")
+
+    if args.json:
+        args.json.write_text(json.dumps({"config": {"rows": args.rows}, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,506 @@
+"""
+End-to-end chat turn latency, broken down by stage, without Streamlit.
+
+    python benchmarks/bench_chat_turn.py --corpus-sizes 100 1000 10000 --concurrency 1 4 16
+    python benchmarks/bench_chat_turn.py --stream --ttft 0.5 --json results.json
+
+Drives rag_query and handle_booking_intent from worker threads, each
+with its own session state, against a local mock Groq server, a
+temporary SQLite database and a simulated SMTP server. Reports
+p50/p95/p99 per stage for every (corpus size, concurrency) pair;
+--json writes them with the run configuration for diffing.
+"""
+import argparse
+import functools
+import hashlib
+import itertools
+import json
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+import uuid
+from collections import defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR / "app"))
+sys.path.append(str(ROOT_DIR))
+
+from mock_groq_server import (
+    DEFAULT_TOKEN_INTERVAL_SECONDS,
+    DEFAULT_TOKENS,
+    DEFAULT_TTFT_SECONDS,
+    MockGroqServer,
+)
+
+
+EXAMPLE_PDFS_DIR = ROOT_DIR / "Example Documents for RAG"
+FAKE_EMBEDDING_DIM = 384
+
+QUESTIONS = [
+    "What is artificial intelligence?",
+    "How does machine learning differ from deep learning?",
+    "What are common applications of AI in healthcare?",
+    "What ethical concerns does the guide raise?",
+    "Summarize the history of AI research.",
+    "What is a neural network?",
+]
+
+SPECIALTIES = ["Cardiology", "Dermatology", "Neurology", "Pediatrics", "Orthopedics"]
+
+
+# ---------------- HEADLESS STREAMLIT ----------------
+
+class _ThreadSessionState:
+    """
+    st.session_state stand-in: one attribute dict per thread,
+    so every worker thread behaves like its own browser session.
+    """
+
+    def __init__(self):
+        object.__setattr__(self, "_local", threading.local())
+
+    def _state(self) -> dict:
+        local = object.__getattribute__(self, "_local")
+        if not hasattr(local, "state"):
+            local.state = {}
+        return local.state
+
+    def __getattr__(self, name):
+        try:
+            return self._state()[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self._state()[name] = value
+
+    def __delattr__(self, name):
+        del self._state()[name]
+
+    def __contains__(self, name):
+        return name in self._state()
+
+    def __getitem__(self, name):
+        return self._state()[name]
+
+    def __setitem__(self, name, value):
+        self._state()[name] = value
+
+    def get(self, name, default=None):
+        return self._state().get(name, default)
+
+    def clear(self):
+        self._state().clear()
+
+
+def install_headless_streamlit(secrets: dict):
+    """
+    Registers a minimal streamlit module exposing the session
+    state and secrets the app modules use. Must run before they
+    are imported.
+    """
+    st = types.ModuleType("streamlit")
+    st.session_state = _ThreadSessionState()
+    st.secrets = secrets
+    sys.modules["streamlit"] = st
+    return st
+
+
+class MockSMTP:
+    """
+    smtplib.SMTP stand-in that only waits, as a real server round
+    trip would: one delay per command.
+    """
+
+    latency = 0.05
+    sent = 0
+    _lock = threading.Lock()
+
+    def __init__(self, host=None, port=None, *args, **kwargs):
+        time.sleep(self.latency)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        time.sleep(self.latency)
+        return False
+
+    def starttls(self, *args, **kwargs):
+        time.sleep(self.latency)
+
+    def login(self, user, password):
+        time.sleep(self.latency)
+
+    def send_message(self, msg, *args, **kwargs):
+        time.sleep(self.latency)
+        with MockSMTP._lock:
+            MockSMTP.sent += 1
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Hash-seeded random unit vectors, for machines without the
+    sentence-transformers model. Latencies then exclude encoding.
+    """
+
+    def __init__(self, model_name=None, **kwargs):
+        self.model_name = model_name
+
+    def _vector(self, text: str):
+        seed = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+        vector = np.random.default_rng(seed).standard_normal(FAKE_EMBEDDING_DIM)
+        return (vector / np.linalg.norm(vector)).astype(np.float32).tolist()
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+# ---------------- STAGE TIMING ----------------
+
+class StageTimer:
+    """
+    Collects wall-clock samples per stage from every thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.samples = defaultdict(list)
+
+    def wrap(self, stage: str, fn):
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - started)
+        return timed
+
+    def wrap_stream(self, stage: str, fn):
+        """
+        Times a generator function until exhaustion, and
+        separately until its first item as <stage>_first_token.
+        """
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            first = True
+            try:
+                for item in fn(*args, **kwargs):
+                    if first:
+                        self.record(f"{stage}_first_token", time.perf_counter() - started)
+                        first = False
+                    yield item
+            finally:
+                self.record(stage, time.perf_counter() - started)
+        return timed
+
+    def summary(self) -> dict:
+        with self._lock:
+            samples = {stage: list(values) for stage, values in self.samples.items()}
+
+        summary = {}
+        for stage, values in sorted(samples.items()):
+            ms = np.array(values) * 1000
+            summary[stage] = {
+                "count": len(values),
+                "mean_ms": float(ms.mean()),
+                "p50_ms": float(np.percentile(ms, 50)),
+                "p95_ms": float(np.percentile(ms, 95)),
+                "p99_ms": float(np.percentile(ms, 99)),
+            }
+        return summary
+
+
+def instrument(timer: StageTimer):
+    """
+    Wraps the functions each stage runs through. Only module
+    attributes are replaced, so the code under test is unchanged.
+    """
+    import booking_flow
+    import rag_pipeline
+    import llm.chatgroq_llm as chatgroq_llm
+    from langchain_community.vectorstores import FAISS
+
+    rag_pipeline.get_embeddings = timer.wrap("embedding_load", rag_pipeline.get_embeddings)
+    rag_pipeline.load_faiss_index = timer.wrap("index_load", rag_pipeline.load_faiss_index)
+    rag_pipeline.embed_query = timer.wrap("query_embedding", rag_pipeline.embed_query)
+    rag_pipeline.build_context = timer.wrap("context_packing", rag_pipeline.build_context)
+    FAISS.similarity_search_by_vector = timer.wrap("search", FAISS.similarity_search_by_vector)
+
+    chatgroq_llm.generate_llm_response = timer.wrap("llm", chatgroq_llm.generate_llm_response)
+    chatgroq_llm.stream_llm_response = timer.wrap_stream("llm", chatgroq_llm.stream_llm_response)
+
+    booking_flow.is_slot_available = timer.wrap("db_slot_check", booking_flow.is_slot_available)
+    booking_flow.suggest_nearby_slots = timer.wrap("db_slot_check", booking_flow.suggest_nearby_slots)
+    booking_flow.reserve_slot = timer.wrap("db_save", booking_flow.reserve_slot)
+    booking_flow.send_confirmation_email = timer.wrap("smtp", booking_flow.send_confirmation_email)
+
+
+# ---------------- WORKLOAD ----------------
+
+def build_corpus(session_id: str, size: int, seed_texts: list[str]):
+    """
+    Writes a session index of `size` chunks cycled from the example
+    documents, sized and indexed the way ingest_pdfs would.
+    """
+    from langchain_community.vectorstores import FAISS
+
+    import rag_pipeline
+    from utils.embedder import embed_texts
+    from utils.faiss_store import save_faiss_index
+    from utils.index_factory import build_index, choose_index_kind, needs_rebuild
+
+    embeddings = rag_pipeline.get_embeddings(rag_pipeline.EMBEDDING_MODEL_NAME)
+
+    texts = [
+        f"[{i // len(seed_texts)}] {seed_texts[i % len(seed_texts)]}"
+        for i in range(size)
+    ]
+    metadatas = [
+        {
+            "source": f"bench-{i // 100}.pdf",
+            "document": f"bench-{i // 100}",
+            "page": 1,
+            "start_index": 0,
+            "end_index": len(text),
+        }
+        for i, text in enumerate(texts)
+    ]
+    ids = [f"bench:{i}" for i in range(size)]
+    vectors = embed_texts(embeddings, texts)
+
+    vector_store = FAISS.from_embeddings(
+        zip(texts, vectors), embeddings, metadatas=metadatas, ids=ids
+    )
+
+    kind = rag_pipeline.INDEX_KIND
+    if kind == "auto":
+        kind = choose_index_kind(size)
+    index_params = {}
+    if needs_rebuild(vector_store.index, index_params, kind, rag_pipeline.INDEX_STORAGE):
+        vector_store.index, index_params = build_index(vectors, kind, rag_pipeline.INDEX_STORAGE)
+
+    manifest = {
+        "documents": {"bench": {"name": "bench corpus", "ids": ids}},
+        "index": index_params or {"kind": "flat", "storage": "float32"},
+    }
+    save_faiss_index(vector_store, session_id, manifest)
+
+
+def run_rag_turns(st, session_id: str, turns: int, stream: bool, worker: int):
+    import rag_pipeline
+
+    st.session_state.session_id = session_id
+    # No corpus version: every turn misses the answer cache
+    st.session_state.corpus_version = None
+
+    durations = []
+    for turn in range(turns):
+        question = f"{QUESTIONS[turn % len(QUESTIONS)]} (worker {worker}, turn {turn})"
+        started = time.perf_counter()
+        reply = rag_pipeline.rag_query(question, stream=stream)
+        if stream:
+            reply = "".join(reply)
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+_booking_days = itertools.count()
+_booking_days_lock = threading.Lock()
+
+
+def run_booking_conversations(st, conversations: int, worker: int):
+    import booking_flow
+
+    durations = []
+    for n in range(conversations):
+        with _booking_days_lock:
+            day = next(_booking_days)
+
+        messages = [
+            "I want to book an appointment",
+            f"Bench Patient {worker}-{n}",
+            f"patient{worker}.{n}@example.com",
+            "5550100123",
+            SPECIALTIES[worker % len(SPECIALTIES)],
+            (date(2030, 1, 1) + timedelta(days=day)).isoformat(),
+            "10:30 AM",
+            "yes",
+        ]
+
+        started = time.perf_counter()
+        for message in messages:
+            booking_flow.handle_booking_intent(message)
+        durations.append(time.perf_counter() - started)
+
+        st.session_state.clear()
+    return durations
+
+
+def run_level(st, timer, session_id: str, concurrency: int, args) -> dict:
+    timer.reset()
+    errors = []
+
+    def worker(n):
+        try:
+            for seconds in run_rag_turns(st, session_id, args.turns, args.stream, n):
+                timer.record("rag_turn", seconds)
+            for seconds in run_booking_conversations(st, args.bookings, n):
+                timer.record("booking_conversation", seconds)
+        except Exception as e:
+            errors.append(repr(e))
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        "concurrency": concurrency,
+        "wall_seconds": time.perf_counter() - started,
+        "errors": errors,
+        "stages": timer.summary(),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus-sizes", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--turns", type=int, default=10, help="RAG questions per worker")
+    parser.add_argument("--bookings", type=int, default=2, help="booking conversations per worker")
+    parser.add_argument("--stream", action="store_true", help="stream LLM answers")
+    parser.add_argument("--ttft", type=float, default=DEFAULT_TTFT_SECONDS)
+    parser.add_argument("--token-interval", type=float, default=DEFAULT_TOKEN_INTERVAL_SECONDS)
+    parser.add_argument("--tokens", type=int, default=DEFAULT_TOKENS)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0)
+    parser.add_argument("--smtp-latency", type=float, default=MockSMTP.latency)
+    parser.add_argument("--fake-embeddings", action="store_true",
+                        help="hash-based vectors instead of loading the model")
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    args = parser.parse_args()
+
+    server = MockGroqServer(
+        ttft=args.ttft,
+        token_interval=args.token_interval,
+        tokens=args.tokens,
+        rate_limit_ratio=args.rate_limit_ratio,
+    ).start()
+
+    st = install_headless_streamlit({
+        "GROQ_API_KEY": "bench",
+        "SMTP_SERVER": "localhost",
+        "SMTP_PORT": 25,
+        "SMTP_EMAIL": "bench@example.com",
+        "SMTP_PASSWORD": "bench",
+    })
+
+    if args.fake_embeddings:
+        import utils.embedding_registry as embedding_registry
+        embedding_registry.HuggingFaceEmbeddings = FakeEmbeddings
+
+    import db.database as database
+    import llm.chatgroq_llm as chatgroq_llm
+    import rag_pipeline
+    import tools
+    import utils.embedding_cache as embedding_cache
+    from db.models import create_tables
+    from utils.embedding_registry import get_embedding_stats
+    from utils.faiss_store import delete_faiss_index
+
+    chatgroq_llm.GROQ_API_URL = server.url
+    MockSMTP.latency = args.smtp_latency
+    tools.smtplib.SMTP = MockSMTP
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_chat_turn_"))
+    database.DB_PATH = workdir / "booking.db"
+    create_tables()
+    # Keep benchmark vectors out of the app's shared embedding cache
+    embedding_cache.BASE_EMBEDDING_CACHE_DIR = workdir / "embedding_cache"
+
+    splitter = rag_pipeline.RecursiveCharacterTextSplitter(
+        chunk_size=rag_pipeline.CHUNK_SIZE,
+        chunk_overlap=rag_pipeline.CHUNK_OVERLAP,
+    )
+    seed_texts = []
+    for path in sorted(EXAMPLE_PDFS_DIR.glob("*.pdf")):
+        with open(path, "rb") as pdf:
+            seed_texts.extend(text for text, _ in rag_pipeline.iter_document_chunks(pdf, splitter))
+
+    timer = StageTimer()
+    instrument(timer)
+
+    results = []
+    print(f"{'chunks':>7} {'conc':>4} {'stage':>22} {'n':>5} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+
+    for size in args.corpus_sizes:
+        session_id = f"bench-{uuid.uuid4().hex[:8]}"
+        started = time.perf_counter()
+        build_corpus(session_id, size, seed_texts)
+        build_seconds = time.perf_counter() - started
+
+        for concurrency in args.concurrency:
+            level = run_level(st, timer, session_id, concurrency, args)
+            level.update({"corpus_size": size, "corpus_build_seconds": build_seconds})
+            results.append(level)
+
+            for stage, row in level["stages"].items():
+                print(f"{size:>7} {concurrency:>4} {stage:>22} {row['count']:>5} "
+                      f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f}")
+            for error in level["errors"]:
+                print("  error:", error)
+
+        delete_faiss_index(session_id)
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            "git_revision": git_revision(),
+            "config": {
+                key: str(value) if isinstance(value, Path) else value
+                for key, value in vars(args).items()
+            },
+            "embedding_model": get_embedding_stats(),
+            "llm_server": server.stats(),
+            "emails_sent": MockSMTP.sent,
+            "results": results,
+        }, indent=2))
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
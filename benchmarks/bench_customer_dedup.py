@@ -0,0 +1,202 @@
+"""
+Customer table size and dashboard join time before and after the
+customer deduplication migration, on a synthetic database where
+patients come back for several bookings.
+
+    python benchmarks/bench_customer_dedup.py --bookings 200000 --patients 20000
+    python benchmarks/bench_customer_dedup.py --json dedup.json
+
+Loads bookings the way the old save_booking did (one customer row per
+booking, email as typed), migrates, checks no booking lost its
+customer, then books again through tools.save_booking to show the
+table no longer grows for returning patients.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR / "app"))
+sys.path.append(str(ROOT_DIR))
+
+import db.database as database
+from db.migrations import get_schema_version, migrate
+
+
+SPECIALTIES = ["Cardiology", "Dermatology", "Neurology", "Pediatrics", "Orthopedics"]
+START_DATE = date(2030, 1, 1)
+DAYS = 365
+INSERT_BATCH = 50_000
+
+# admin_dashboard.fetch_all_bookings
+DASHBOARD_QUERY = """
+    SELECT
+        b.id AS booking_id,
+        c.name,
+        c.email,
+        c.phone,
+        b.booking_type,
+        b.date,
+        b.time,
+        b.status,
+        b.created_at
+    FROM bookings b
+    JOIN customers c ON b.customer_id = c.customer_id
+    ORDER BY b.date, b.time
+"""
+
+
+def _typed_email(patient: int, rng: random.Random) -> str:
+    # Returning patients don't always type their email the same way
+    email = f"patient{patient}@example.com"
+    if rng.random() < 0.3:
+        email = email.capitalize()
+    if rng.random() < 0.1:
+        email = f" {email} "
+    return email
+
+
+def load_rows(bookings: int, patients: int, seed: int = 0):
+    rng = random.Random(seed)
+    batch = []
+    for i in range(bookings):
+        patient = rng.randrange(patients)
+        minutes = 9 * 60 + 30 * rng.randrange(16)
+        batch.append((
+            i + 1,
+            f"Patient {patient}",
+            _typed_email(patient, rng),
+            "5550100123",
+            rng.choice(SPECIALTIES),
+            (START_DATE + timedelta(days=rng.randrange(DAYS))).isoformat(),
+            f"{minutes // 60:02d}:{minutes % 60:02d}",
+            minutes,
+        ))
+        if len(batch) == INSERT_BATCH:
+            _insert_rows(batch)
+            batch = []
+    if batch:
+        _insert_rows(batch)
+
+
+def _insert_rows(batch):
+    with database.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO customers (customer_id, name, email, phone) VALUES (?, ?, ?, ?)",
+            (row[:4] for row in batch),
+        )
+        conn.executemany(
+            """
+            INSERT INTO bookings (
+                customer_id, booking_type, date, time, status, start_minute, end_minute
+            )
+            VALUES (?, ?, ?, ?, 'CONFIRMED', ?, ? + 30)
+            """,
+            ((row[0], row[4], row[5], row[6], row[7], row[7]) for row in batch),
+        )
+
+
+def measure(repeats: int) -> dict:
+    with database.connection() as conn:
+        customers = conn.execute("SELECT COUNT(*) FROM customers").fetchone()[0]
+        bookings = conn.execute("SELECT COUNT(*) FROM bookings").fetchone()[0]
+        orphans = conn.execute("""
+            SELECT COUNT(*) FROM bookings b
+            LEFT JOIN customers c ON b.customer_id = c.customer_id
+            WHERE c.customer_id IS NULL
+        """).fetchone()[0]
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            conn.execute(DASHBOARD_QUERY).fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "schema_version": get_schema_version(),
+        "customers": customers,
+        "bookings": bookings,
+        "orphan_bookings": orphans,
+        "db_mb": pages * page_size / 1e6,
+        "dashboard_join_ms": statistics.median(timings),
+    }
+
+
+def rebook(patients: int, count: int, seed: int = 1) -> int:
+    """
+    Books count more appointments for existing patients through
+    tools.save_booking; returns how many customer rows were added.
+    """
+    from tools import save_booking
+
+    rng = random.Random(seed)
+    with database.connection() as conn:
+        before = conn.execute("SELECT COUNT(*) FROM customers").fetchone()[0]
+    for _ in range(count):
+        patient = rng.randrange(patients)
+        save_booking({
+            "name": f"Patient {patient}",
+            "email": _typed_email(patient, rng),
+            "phone": "5550100123",
+            "doctor_or_specialty": rng.choice(SPECIALTIES),
+            "date": (START_DATE + timedelta(days=DAYS + rng.randrange(30))).isoformat(),
+            "time": "10:00",
+        })
+    with database.connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM customers").fetchone()[0] - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=200_000)
+    parser.add_argument("--patients", type=int, default=20_000)
+    parser.add_argument("--rebookings", type=int, default=1_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    args = parser.parse_args()
+
+    database.DB_PATH = Path(tempfile.mkdtemp(prefix="bench_customer_dedup_")) / "booking.db"
+
+    migrate(target=3)
+    load_rows(args.bookings, args.patients)
+
+    runs = {"before": measure(args.repeats)}
+    started = time.perf_counter()
+    migrate()
+    migration_seconds = time.perf_counter() - started
+    with database.connection() as conn:
+        # Reclaim the deleted customer rows so db_mb compares fairly
+        conn.execute("VACUUM")
+    runs["after"] = measure(args.repeats)
+    new_customers = rebook(args.patients, args.rebookings)
+
+    print(f"Migrated to version {runs['after']['schema_version']} in {migration_seconds:.1f}s\n")
+    print(f"{'':>18} {'before':>10} {'after':>10}")
+    for key in ("customers", "bookings", "orphan_bookings", "db_mb", "dashboard_join_ms"):
+        before, after = runs["before"][key], runs["after"][key]
+        if isinstance(before, float):
+            print(f"{key:>18} {before:>10.2f} {after:>10.2f}")
+        else:
+            print(f"{key:>18} {before:>10} {after:>10}")
+    print(f"\n{args.rebookings} bookings by returning patients added {new_customers} customers")
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            "config": {"bookings": args.bookings, "patients": args.patients},
+            "migration_seconds": migration_seconds,
+            "runs": runs,
+            "rebookings": args.rebookings,
+            "customers_added_by_rebookings": new_customers,
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Earliest-free-slot search over a year of dense bookings: the merged
+single-pass search against per-day and per-candidate lookups.
+
+    python benchmarks/bench_earliest_slots.py
+    python benchmarks/bench_earliest_slots.py --specialties 20 --density 0.99 --json slots.json
+
+Every specialty is booked at --density within clinic hours for a
+year; with --full-days N the first N days are booked solid, so the
+search has to walk far before finding anything.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR / "app"))
+sys.path.append(str(ROOT_DIR))
+
+import db.database as database
+from db.models import create_tables
+
+
+START_DATE = date(2030, 1, 1)
+DAYS = 365
+
+
+def load_year(specialties: int, density: float, full_days: int, seed: int = 0):
+    from availability import (
+        CLINIC_CLOSE_MINUTE,
+        CLINIC_OPEN_MINUTE,
+        SLOT_DURATION_MINUTES,
+        SLOT_STEP_MINUTES,
+    )
+
+    rng = random.Random(seed)
+    rows = []
+    for n in range(DAYS):
+        day = (START_DATE + timedelta(days=n)).isoformat()
+        for s in range(specialties):
+            for start in range(CLINIC_OPEN_MINUTE, CLINIC_CLOSE_MINUTE, SLOT_STEP_MINUTES):
+                if n < full_days or rng.random() < density:
+                    rows.append((
+                        f"Specialty {s}", day, f"{start // 60:02d}:{start % 60:02d}",
+                        start, start + SLOT_DURATION_MINUTES,
+                    ))
+
+    with database.transaction() as conn:
+        conn.executemany(
+            """
+            INSERT INTO bookings (booking_type, date, time, start_minute, end_minute, status)
+            VALUES (?, ?, ?, ?, ?, 'CONFIRMED')
+            """,
+            rows,
+        )
+    return len(rows)
+
+
+def merged_search(specialties, start, end, count):
+    from availability import find_earliest_slots
+    return find_earliest_slots(specialties, start, end, count)
+
+
+def per_day_search(specialties, start, end, count):
+    """
+    One day query per (day, specialty), as a loop over
+    DayAvailability would do without the merge.
+    """
+    from availability import (
+        CLINIC_CLOSE_MINUTE,
+        CLINIC_OPEN_MINUTE,
+        SLOT_DURATION_MINUTES,
+        SLOT_STEP_MINUTES,
+        DayAvailability,
+        _load_busy_intervals,
+    )
+
+    found = []
+    day = date.fromisoformat(start)
+    while day <= date.fromisoformat(end) and len(found) < count:
+        for specialty in specialties:
+            availability = DayAvailability(_load_busy_intervals(day.isoformat(), specialty))
+            for minute in range(CLINIC_OPEN_MINUTE,
+                                CLINIC_CLOSE_MINUTE - SLOT_DURATION_MINUTES + 1,
+                                SLOT_STEP_MINUTES):
+                if availability.is_free(minute):
+                    found.append((day.isoformat(), minute, specialty))
+        day += timedelta(days=1)
+    return sorted(found)[:count]
+
+
+def per_candidate_search(specialties, start, end, count):
+    """
+    One is_slot_available query per candidate slot, the way a
+    patient guessing dates and times probes the database.
+    """
+    from availability import CLINIC_CLOSE_MINUTE, CLINIC_OPEN_MINUTE, SLOT_DURATION_MINUTES, SLOT_STEP_MINUTES
+    from tools import is_slot_available, minutes_to_time_str
+
+    found = []
+    day = date.fromisoformat(start)
+    while day <= date.fromisoformat(end) and len(found) < count:
+        for minute in range(CLINIC_OPEN_MINUTE,
+                            CLINIC_CLOSE_MINUTE - SLOT_DURATION_MINUTES + 1,
+                            SLOT_STEP_MINUTES):
+            for specialty in specialties:
+                if is_slot_available(day.isoformat(), minutes_to_time_str(minute), specialty):
+                    found.append((day.isoformat(), minute, specialty))
+        day += timedelta(days=1)
+    return sorted(found)[:count]
+
+
+def timed(fn, repeats: int, *args):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+    return result, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--specialties", type=int, default=10)
+    parser.add_argument("--density", type=float, default=0.97)
+    parser.add_argument("--full-days", type=int, default=0)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 3, 10])
+    parser.add_argument("--range-days", type=int, nargs="+", default=[7, 30, 365])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    args = parser.parse_args()
+
+    database.DB_PATH = Path(tempfile.mkdtemp(prefix="bench_earliest_slots_")) / "booking.db"
+    create_tables()
+    rows = load_year(args.specialties, args.density, args.full_days)
+    print(f"Loaded {rows} bookings over {DAYS} days for {args.specialties} specialties")
+
+    searches = {
+        "merged": merged_search,
+        "per_day": per_day_search,
+        "per_candidate": per_candidate_search,
+    }
+
+    results = []
+    print(f"\n{'doctors':>7} {'days':>5} {'k':>3} " + " ".join(f"{name + ' ms':>16}" for name in searches))
+    for doctors in sorted({1, args.specialties}):
+        specialties = [f"Specialty {s}" for s in range(doctors)]
+        for range_days in args.range_days:
+            end = (START_DATE + timedelta(days=range_days - 1)).isoformat()
+            for count in args.counts:
+                row = {"doctors": doctors, "range_days": range_days, "count": count}
+                expected = None
+                for name, search in searches.items():
+                    found, median_ms = timed(search, args.repeats, specialties, START_DATE.isoformat(), end, count)
+                    found = [
+                        (slot.date, slot.start_minute, slot.doctor_or_specialty)
+                        if hasattr(slot, "date") else slot
+                        for slot in found
+                    ]
+                    if expected is None:
+                        expected = found
+                    row[f"{name}_ms"] = median_ms
+                    row[f"{name}_agrees"] = found == expected
+                results.append(row)
+                print(f"{doctors:>7} {range_days:>5} {count:>3} "
+                      + " ".join(f"{row[name + '_ms']:>16.2f}" for name in searches))
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            "bookings": rows,
+            "config": {key: str(value) if isinstance(value, Path) else value
+                       for key, value in vars(args).items()},
+            "results": results,
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
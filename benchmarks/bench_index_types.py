@@ -0,0 +1,117 @@
+"""
+Recall@k, size and search latency of flat / IVF / HNSW indexes
+with float32 / float16 / PQ storage on synthetic clustered corpora.
+
+    python benchmarks/bench_index_types.py --sizes 1000 10000 100000 1000000
+    python benchmarks/bench_index_types.py --storage float32 float16 pq
+
+Results are printed as a table; --json writes them for diffing.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR / "app"))
+
+import faiss
+
+from utils.index_factory import INDEX_KINDS, build_index, choose_index_kind
+
+
+DIM = 384  # all-MiniLM-L6-v2
+
+
+def synthetic_corpus(num_vectors: int, num_queries: int, seed: int = 0):
+    """
+    Normalized vectors drawn around random topic centroids,
+    roughly mimicking sentence embeddings of a document set.
+    """
+    rng = np.random.default_rng(seed)
+    num_topics = max(8, num_vectors // 500)
+    centroids = rng.standard_normal((num_topics, DIM)).astype(np.float32)
+
+    def sample(n):
+        topics = rng.integers(0, num_topics, n)
+        points = centroids[topics] + 0.6 * rng.standard_normal((n, DIM)).astype(np.float32)
+        points /= np.linalg.norm(points, axis=1, keepdims=True)
+        return points
+
+    return sample(num_vectors), sample(num_queries)
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def bench(num_vectors: int, num_queries: int, k: int, storage_modes: list[str]) -> list[dict]:
+    corpus, queries = synthetic_corpus(num_vectors, num_queries)
+    _, truth = faiss.knn(queries, corpus, k)
+    results = []
+
+    for kind in INDEX_KINDS:
+        if kind == "ivf" and num_vectors < 39:
+            continue
+
+        for storage in storage_modes:
+            started = time.perf_counter()
+            index, params = build_index(corpus, kind, storage)
+            build_seconds = time.perf_counter() - started
+
+            latencies = []
+            found = np.empty((num_queries, k), dtype=np.int64)
+            for i, query in enumerate(queries):
+                started = time.perf_counter()
+                _, ids = index.search(query[None, :], k)
+                latencies.append(time.perf_counter() - started)
+                found[i] = ids[0]
+
+            latencies_ms = np.array(latencies) * 1000
+            results.append({
+                "num_vectors": num_vectors,
+                "kind": kind,
+                "storage": params["storage"],
+                "auto_choice": choose_index_kind(num_vectors) == kind,
+                "params": params,
+                "build_seconds": build_seconds,
+                "bytes_per_vector": faiss.serialize_index(index).nbytes / num_vectors,
+                f"recall_at_{k}": recall_at_k(found, truth),
+                "p50_ms": float(np.percentile(latencies_ms, 50)),
+                "p95_ms": float(np.percentile(latencies_ms, 95)),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--storage", nargs="+", default=["float32"],
+                        choices=["float32", "float16", "pq"])
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'vectors':>9} {'kind':>5} {'storage':>8} {'auto':>4} {'build s':>8} "
+          f"{'B/vec':>7} {'recall@' + str(args.k):>9} {'p50 ms':>7} {'p95 ms':>7}")
+    for size in args.sizes:
+        for row in bench(size, args.queries, args.k, args.storage):
+            results.append(row)
+            print(f"{row['num_vectors']:>9} {row['kind']:>5} {row['storage']:>8} "
+                  f"{'*' if row['auto_choice'] else '':>4} "
+                  f"{row['build_seconds']:>8.2f} {row['bytes_per_vector']:>7.0f} "
+                  f"{row[f'recall_at_{args.k}']:>9.3f} "
+                  f"{row['p50_ms']:>7.3f} {row['p95_ms']:>7.3f}")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
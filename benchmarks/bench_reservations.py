@@ -0,0 +1,169 @@
+"""
+Multi-process stress test for slot reservation: many processes
+confirm bookings for the same few slots at once, then the database
+is checked for overlapping bookings.
+
+    python benchmarks/bench_reservations.py --processes 16 --attempts 25
+    python benchmarks/bench_reservations.py --mode check-then-insert
+
+--mode atomic uses tools.reserve_slot; check-then-insert reproduces
+the old flow (is_slot_available, then save_booking) for comparison.
+"""
+import argparse
+import json
+import multiprocessing
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR / "app"))
+sys.path.append(str(ROOT_DIR))
+
+
+DATE = "2030-01-07"
+SPECIALTIES = ["Cardiology", "Neurology"]
+# 15 minute grid: neighbouring candidates overlap a 30 minute slot
+CANDIDATE_TIMES = [f"{9 + m // 60:02d}:{m % 60:02d}" for m in range(0, 180, 15)]
+
+
+def _worker(db_path: str, mode: str, attempts: int, seed: int, start, results):
+    import db.database as database
+    database.DB_PATH = Path(db_path)
+
+    from tools import is_slot_available, reserve_slot, save_booking
+
+    rng = random.Random(seed)
+    reserved = 0
+    rejected = 0
+    latencies = []
+    start.wait()
+
+    for attempt in range(attempts):
+        booking = {
+            "name": f"Patient {seed}-{attempt}",
+            "email": f"patient{seed}.{attempt}@example.com",
+            "phone": "5550100123",
+            "doctor_or_specialty": rng.choice(SPECIALTIES),
+            "date": DATE,
+            "time": rng.choice(CANDIDATE_TIMES),
+        }
+
+        started = time.perf_counter()
+        if mode == "atomic":
+            ok = reserve_slot(booking).reserved
+        else:
+            ok = is_slot_available(booking["date"], booking["time"], booking["doctor_or_specialty"])
+            if ok:
+                save_booking(booking)
+        latencies.append(time.perf_counter() - started)
+
+        if ok:
+            reserved += 1
+        else:
+            rejected += 1
+
+    results.put((reserved, rejected, latencies))
+
+
+def count_double_bookings(db_path: Path) -> int:
+    """
+    Pairs of bookings on the same date and specialty whose
+    slots overlap.
+    """
+    import db.database as database
+    from tools import SLOT_DURATION_MINUTES, normalize_time_to_minutes
+
+    database.DB_PATH = db_path
+    with database.connection() as conn:
+        rows = conn.execute(
+            "SELECT booking_type, date, time FROM bookings ORDER BY booking_type, date"
+        ).fetchall()
+
+    days = {}
+    for specialty, day, time_str in rows:
+        days.setdefault((specialty, day), []).append(normalize_time_to_minutes(time_str))
+
+    doubles = 0
+    for minutes in days.values():
+        minutes.sort()
+        for i, start in enumerate(minutes):
+            for later in minutes[i + 1:]:
+                if later - start >= SLOT_DURATION_MINUTES:
+                    break
+                doubles += 1
+    return doubles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--processes", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=25, help="confirmations per process")
+    parser.add_argument("--mode", choices=["atomic", "check-then-insert"], default="atomic")
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    args = parser.parse_args()
+
+    db_path = Path(tempfile.mkdtemp(prefix="bench_reservations_")) / "booking.db"
+
+    import db.database as database
+    from db.models import create_tables
+
+    database.DB_PATH = db_path
+    create_tables()
+
+    # spawn: children must not inherit the parent's open connections
+    context = multiprocessing.get_context("spawn")
+    start = context.Event()
+    results = context.Queue()
+    workers = [
+        context.Process(
+            target=_worker,
+            args=(str(db_path), args.mode, args.attempts, seed, start, results),
+        )
+        for seed in range(args.processes)
+    ]
+    for worker in workers:
+        worker.start()
+
+    # Let every process import and connect before releasing them together
+    time.sleep(2)
+    started = time.perf_counter()
+    start.set()
+
+    reserved = rejected = 0
+    latencies = []
+    for _ in workers:
+        worker_reserved, worker_rejected, worker_latencies = results.get()
+        reserved += worker_reserved
+        rejected += worker_rejected
+        latencies.extend(worker_latencies)
+    wall_seconds = time.perf_counter() - started
+
+    for worker in workers:
+        worker.join()
+
+    latencies_ms = sorted(seconds * 1000 for seconds in latencies)
+    summary = {
+        "mode": args.mode,
+        "processes": args.processes,
+        "confirmations": len(latencies),
+        "reserved": reserved,
+        "rejected": rejected,
+        "double_bookings": count_double_bookings(db_path),
+        "confirmations_per_second": len(latencies) / wall_seconds,
+        "p50_ms": statistics.median(latencies_ms),
+        "p95_ms": latencies_ms[int(0.95 * (len(latencies_ms) - 1))],
+    }
+
+    for key, value in summary.items():
+        print(f"{key:>25}: {value:.2f}" if isinstance(value, float) else f"{key:>25}: {value}")
+
+    if args.json:
+        args.json.write_text(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Local OpenAI-compatible chat completions server for benchmarks.
+
+    python benchmarks/mock_groq_server.py --port 8008 --ttft 0.3 --tokens 80
+
+Serves POST /v1/chat/completions, both plain and streamed (SSE),
+with configurable time to first token, per-token delay and a
+fraction of requests rejected with 429 to exercise retries.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+DEFAULT_TTFT_SECONDS = 0.3
+DEFAULT_TOKEN_INTERVAL_SECONDS = 0.01
+DEFAULT_TOKENS = 60
+
+
+class MockGroqServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address=("127.0.0.1", 0),
+        ttft: float = DEFAULT_TTFT_SECONDS,
+        token_interval: float = DEFAULT_TOKEN_INTERVAL_SECONDS,
+        tokens: int = DEFAULT_TOKENS,
+        rate_limit_ratio: float = 0.0,
+    ):
+        super().__init__(address, _Handler)
+        self.ttft = ttft
+        self.token_interval = token_interval
+        self.tokens = tokens
+        self.rate_limit_ratio = rate_limit_ratio
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def start(self):
+        """
+        Serves from a daemon thread; returns self.
+        """
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def handle_error(self, request, client_address):
+        # Clients dropping idle keep-alive connections is expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": self.requests, "rate_limited": self.rate_limited}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive plus chunked transfer, like the real API
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+        with server._lock:
+            server.requests += 1
+            limited = random.random() < server.rate_limit_ratio
+            if limited:
+                server.rate_limited += 1
+
+        if limited:
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached"}},
+                {"Retry-After": "0"},
+            )
+            return
+
+        words = [f" token{i}" for i in range(server.tokens)]
+        time.sleep(server.ttft)
+
+        if not payload.get("stream"):
+            time.sleep(server.token_interval * len(words))
+            self._send_json(200, {
+                "model": payload.get("model"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(words)},
+                    "finish_reason": "stop",
+                }],
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(server.token_interval)
+            chunk = {"choices": [{"index": 0, "delta": {"content": word}}]}
+            self._send_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+
+        self._send_chunk(b"data: [DONE]\n\n")
+        self._send_chunk(b"")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8008)
+    parser.add_argument("--ttft", type=float, default=DEFAULT_TTFT_SECONDS)
+    parser.add_argument("--token-interval", type=float, default=DEFAULT_TOKEN_INTERVAL_SECONDS)
+    parser.add_argument("--tokens", type=int, default=DEFAULT_TOKENS)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = MockGroqServer(
+        (args.host, args.port),
+        ttft=args.ttft,
+        token_interval=args.token_interval,
+        tokens=args.tokens,
+        rate_limit_ratio=args.rate_limit_ratio,
+    )
+    print(f"Serving {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,202 @@
+import atexit
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
 DB_PATH = Path("db/booking.db")
 
+# Connections kept open per database file
+POOL_SIZE = 8
+# How long a caller waits for a free connection
+POOL_TIMEOUT_SECONDS = 10
+# How long a statement waits on another writer's lock
+BUSY_TIMEOUT_MS = 5000
+# Prepared statements cached per connection
+CACHED_STATEMENTS = 256
+MMAP_SIZE_BYTES = 256 * 1024 * 1024
+# Page cache per connection, in KiB
+CACHE_SIZE_KIB = 16 * 1024
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    """
+    Opens a connection in autocommit mode with the tuned pragmas;
+    transactions are started explicitly by transaction().
+    """
+    path.parent.mkdir(exist_ok=True)
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        isolation_level=None,
+        check_same_thread=False,
+        cached_statements=CACHED_STATEMENTS,
+    )
+    # WAL lets readers run alongside a writer; NORMAL only syncs
+    # at checkpoints, which is still durable against app crashes.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE_BYTES}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of long-lived connections to one database.
+    Connections are opened on demand up to size and handed to one
+    thread at a time; callers block when all are in use.
+    """
+
+    def __init__(self, path: Path, size: int = POOL_SIZE):
+        self.path = Path(path)
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+        self._stats = {"borrowed": 0, "waited": 0, "discarded": 0}
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                create = True
+            else:
+                create = False
+                self._stats["waited"] += 1
+
+        if create:
+            try:
+                return _connect(self.path)
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=POOL_TIMEOUT_SECONDS)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"No database connection free after {POOL_TIMEOUT_SECONDS}s"
+            )
+
+    def _release(self, conn: sqlite3.Connection):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Broken connection: drop it and let the next caller reopen
+            with self._lock:
+                self._opened -= 1
+                self._stats["discarded"] += 1
+            conn.close()
+            return
+
+        if self._closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrows a connection in autocommit mode: every statement
+        is its own transaction unless one is begun explicitly.
+        """
+        conn = self._acquire()
+        with self._lock:
+            self._stats["borrowed"] += 1
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self, immediate: bool = False):
+        """
+        Borrows a connection inside BEGIN ... COMMIT, rolling back
+        if the block raises. immediate=True takes the write lock
+        up front, so a read-then-write cannot be raced by another
+        writer between the two.
+        """
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["open"] = self._opened
+        stats["idle"] = self._idle.qsize()
+        return stats
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Returns the process-wide pool for DB_PATH.
+    """
+    path = Path(DB_PATH)
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = _pools[path] = ConnectionPool(path)
+        return pool
+
+
+def connection():
+    """
+    with connection() as conn: ... on a pooled connection.
+    """
+    return get_pool().connection()
+
+
+def transaction(immediate: bool = False):
+    """
+    with transaction() as conn: ... commits on success and
+    rolls back on error.
+    """
+    return get_pool().transaction(immediate)
+
 
 def get_connection():
-    DB_PATH.parent.mkdir(exist_ok=True)
-    return sqlite3.connect(DB_PATH)
+    """
+    Opens a standalone connection with the pool's settings, for
+    one-off scripts. The caller closes it. App code should use
+    connection() / transaction() instead.
+    """
+    return _connect(Path(DB_PATH))
+
+
+@atexit.register
+def _close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
@@ -0,0 +1,267 @@
+import sqlite3
+import time
+from datetime import datetime
+from functools import lru_cache
+
+from db.database import connection, transaction
+
+
+# Applied in order; each runs in its own transaction and is recorded
+# in schema_version. A step is a SQL statement or a function taking
+# the connection. Never edit a released migration: append a new one.
+MIGRATIONS = [
+    (
+        1,
+        "Base tables",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS customers (
+                customer_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT,
+                email TEXT,
+                phone TEXT
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS bookings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                customer_id INTEGER,
+                booking_type TEXT,
+                date TEXT,
+                time TEXT,
+                status TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
+            )
+            """,
+        ],
+    ),
+    (
+        2,
+        "Indexes for slot checks, date filters and email lookups",
+        [
+            # Slot checks filter on specialty + date, then time
+            """
+            CREATE INDEX IF NOT EXISTS idx_bookings_type_date_time
+            ON bookings (booking_type, date, time)
+            """,
+            # Date filters; time included so ORDER BY date, time needs no sort
+            """
+            CREATE INDEX IF NOT EXISTS idx_bookings_date_time
+            ON bookings (date, time)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_customers_email
+            ON customers (email)
+            """,
+            "ANALYZE",
+        ],
+    ),
+    (
+        3,
+        "Integer start/end minute columns for SQL overlap checks",
+        [
+            "ALTER TABLE bookings ADD COLUMN start_minute INTEGER",
+            "ALTER TABLE bookings ADD COLUMN end_minute INTEGER",
+            lambda conn: _backfill_slot_minutes(conn),
+            # Overlap checks: equality on specialty + date, range on start
+            """
+            CREATE INDEX IF NOT EXISTS idx_bookings_slot
+            ON bookings (booking_type, date, start_minute, end_minute)
+            """,
+            # Superseded by idx_bookings_slot; only slowed down inserts
+            "DROP INDEX IF EXISTS idx_bookings_type_date_time",
+            "ANALYZE",
+        ],
+    ),
+    (
+        4,
+        "One customer per normalized email",
+        [
+            lambda conn: _merge_duplicate_customers(conn),
+            # Replaces the plain index from migration 2; upserts target it
+            "DROP INDEX IF EXISTS idx_customers_email",
+            """
+            CREATE UNIQUE INDEX idx_customers_email
+            ON customers (email)
+            """,
+            "ANALYZE",
+        ],
+    ),
+]
+
+# Slot length when migration 3 ran; later changes must not alter it
+_BACKFILL_SLOT_MINUTES = 30
+
+
+@lru_cache(maxsize=None)
+def _time_to_minutes(time_str):
+    """
+    Frozen copy of tools.normalize_time_to_minutes for the backfill,
+    so this migration keeps its meaning if the app parser changes.
+    """
+    try:
+        time_str = time_str.strip().upper()
+        if "AM" in time_str or "PM" in time_str:
+            dt = datetime.strptime(time_str, "%I:%M %p")
+        else:
+            dt = datetime.strptime(time_str, "%H:%M")
+        return dt.hour * 60 + dt.minute
+    except Exception:
+        return None
+
+
+def _backfill_slot_minutes(conn):
+    # One pass over the table; distinct time strings are few and cached
+    conn.create_function("time_to_minutes", 1, _time_to_minutes, deterministic=True)
+    conn.execute(
+        """
+        UPDATE bookings
+        SET start_minute = time_to_minutes(time),
+            end_minute = time_to_minutes(time) + ?
+        """,
+        (_BACKFILL_SLOT_MINUTES,),
+    )
+
+
+def _normalize_email(email):
+    """
+    Frozen copy of tools.normalize_email for migration 4.
+    """
+    if email is None:
+        return None
+    return email.strip().lower()
+
+
+def _merge_duplicate_customers(conn):
+    """
+    Keeps the oldest customer row per normalized email, with the
+    name and phone of the newest one (what an upsert would have
+    left), repoints their bookings and deletes the rest.
+    """
+    conn.create_function("normalize_email", 1, _normalize_email, deterministic=True)
+    # Statement by statement: executescript would commit the migration
+    for statement in (
+        """
+            CREATE TEMP TABLE customer_groups (
+                keep_id INTEGER PRIMARY KEY,
+                email_key TEXT UNIQUE,
+                latest_id INTEGER
+            )
+        """,
+        """
+            INSERT INTO customer_groups (email_key, keep_id, latest_id)
+            SELECT
+                normalize_email(email) AS email_key,
+                MIN(customer_id) AS keep_id,
+                MAX(customer_id) AS latest_id
+            FROM customers
+            WHERE email IS NOT NULL
+            GROUP BY email_key
+        """,
+        """
+            CREATE TEMP TABLE customer_merges (
+                old_id INTEGER PRIMARY KEY,
+                keep_id INTEGER
+            )
+        """,
+        """
+            INSERT INTO customer_merges (old_id, keep_id)
+            SELECT c.customer_id, g.keep_id
+            FROM customers c
+            JOIN customer_groups g ON g.email_key = normalize_email(c.email)
+            WHERE c.customer_id != g.keep_id
+        """,
+        """
+            UPDATE customers
+            SET (name, phone) = (
+                SELECT latest.name, latest.phone
+                FROM customer_groups g
+                JOIN customers latest ON latest.customer_id = g.latest_id
+                WHERE g.keep_id = customers.customer_id
+            )
+            WHERE customer_id IN (
+                SELECT keep_id FROM customer_groups WHERE latest_id != keep_id
+            )
+        """,
+        """
+            UPDATE bookings
+            SET customer_id = (
+                SELECT keep_id FROM customer_merges WHERE old_id = bookings.customer_id
+            )
+            WHERE customer_id IN (SELECT old_id FROM customer_merges)
+        """,
+        """
+            DELETE FROM customers
+            WHERE customer_id IN (SELECT old_id FROM customer_merges)
+        """,
+        """
+            UPDATE customers
+            SET email = normalize_email(email)
+            WHERE email != normalize_email(email)
+        """,
+        """
+            DROP TABLE temp.customer_groups
+        """,
+        """
+            DROP TABLE temp.customer_merges
+        """,
+    ):
+        conn.execute(statement)
+
+
+def _ensure_version_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at REAL
+        )
+    """)
+
+
+def _current_version(conn) -> int:
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def get_schema_version() -> int:
+    with connection() as conn:
+        try:
+            return _current_version(conn)
+        except sqlite3.OperationalError:
+            return 0
+
+
+def migrate(target: int = None) -> list[int]:
+    """
+    Applies pending migrations up to target (default: all).
+    Safe to run from several processes at once: each migration
+    re-checks the version under the write lock before applying.
+    Returns the versions applied by this call.
+    """
+    with transaction(immediate=True) as conn:
+        _ensure_version_table(conn)
+
+    applied = []
+    for version, description, steps in MIGRATIONS:
+        if target is not None and version > target:
+            break
+
+        with transaction(immediate=True) as conn:
+            if _current_version(conn) >= version:
+                continue
+
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+
+            conn.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (version, description, time.time()),
+            )
+        applied.append(version)
+
+    return applied
@@ -1,31 +1,9 @@
-from db.database import get_connection
+from db.migrations import migrate
 
 
 def create_tables():
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS customers (
-        customer_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT,
-        email TEXT,
-        phone TEXT
-    )
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS bookings (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        customer_id INTEGER,
-        booking_type TEXT,
-        date TEXT,
-        time TEXT,
-        status TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
-    )
-    """)
-
-    conn.commit()
-    conn.close()
+    """
+    Brings the database schema up to date. Tables and indexes
+    are defined as versioned migrations in db.migrations.
+    """
+    migrate()